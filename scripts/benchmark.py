@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""Benchmark the conversion performance of tflite2onnx.
+
+Converts every TFLite model in `assets/tests` (and other given directories),
+and synthetic models of the given numbers of operators, recording the
+conversion time, the peak memory allocated and the size of the ONNX model.
+Results are compared with a stored baseline, and the script exits
+with non-zero if any of them regresses beyond the thresholds.
+
+    python scripts/benchmark.py                    # compare with the baseline
+    python scripts/benchmark.py --update-baseline  # record the baseline
+    python scripts/benchmark.py --synthetic 1000 --synthetic 4000  # scaling
+
+Timing depends on the machine, please record the baseline on the machine that
+runs the comparison, e.g. before and after a change.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+import tflite2onnx  # noqa: E402
+from tflite2onnx import synthetic  # noqa: E402
+from tflite2onnx.common import VALIDATION_LEVELS  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(root_dir, 'assets', 'benchmark-baseline.json')
+DEFAULT_MODEL_DIR = os.path.join(root_dir, 'assets', 'tests')
+
+
+def collectModels(model_dirs):
+    models = dict()
+    for d in model_dirs:
+        for path in sorted(glob.glob(os.path.join(d, '*.tflite'))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            if name in models:
+                print("Skipping %s, which has the same name as %s" % (path, models[name]))
+                continue
+            models[name] = path
+    return models
+
+
+def loadModel(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def synthesizeModels(num_ops_list):
+    """Generators of the float and quantized synthetic models of each number of operators."""
+    models = dict()
+    for num_ops in num_ops_list:
+        for quantized, dtype in ((False, 'float32'), (True, 'uint8')):
+            name = 'synthetic-%d.%s' % (num_ops, dtype)
+            models[name] = (lambda n=num_ops, q=quantized: synthetic.generate(n, quantized=q))
+    return models
+
+
+def benchmark(buf, repeat, validation):
+    """Convert the model, return the time (best of `repeat`), peak memory and ONNX size."""
+    seconds = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        onnx_bytes = tflite2onnx.convert_buffer(buf, serialize=True, validation=validation)
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    # tracing memory slows down conversion, measure it separately
+    profiler = tflite2onnx.Profiler(memory=True)
+    tflite2onnx.convert_buffer(buf, serialize=True, validation=validation, profiler=profiler)
+    peak = profiler.phases['total'][2]
+
+    return {'seconds': seconds, 'peak_bytes': peak, 'onnx_bytes': len(onnx_bytes)}
+
+
+def compare(results, baseline, args):
+    """Compare `results` with `baseline`, return the regressions found."""
+    regressions = []
+    for name, cur in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        if 'error' in cur or 'error' in base:
+            if 'error' in cur and 'error' not in base:
+                regressions.append("%s: failed to convert: %s" % (name, cur['error']))
+            continue
+
+        if (cur['seconds'] > base['seconds'] * (1 + args.time_threshold) and
+                cur['seconds'] - base['seconds'] > args.min_time_delta):
+            regressions.append("%s: time %.2fms -> %.2fms" %
+                               (name, base['seconds'] * 1000, cur['seconds'] * 1000))
+        if (cur['peak_bytes'] > base['peak_bytes'] * (1 + args.memory_threshold) and
+                cur['peak_bytes'] - base['peak_bytes'] > args.min_memory_delta):
+            regressions.append("%s: peak memory %d -> %d bytes" %
+                               (name, base['peak_bytes'], cur['peak_bytes']))
+        if abs(cur['onnx_bytes'] - base['onnx_bytes']) > base['onnx_bytes'] * args.size_threshold:
+            regressions.append("%s: ONNX size %d -> %d bytes" %
+                               (name, base['onnx_bytes'], cur['onnx_bytes']))
+    return regressions
+
+
+def formatResults(results, baseline):
+    lines = ['%-48s %10s %10s %10s %10s' % ('Model', 'Time(ms)', 'Base(ms)', 'Peak(MB)',
+                                            'ONNX(KB)')]
+    for name, cur in results.items():
+        if 'error' in cur:
+            lines.append('%-48s %s' % (name, cur['error']))
+            continue
+        base = baseline.get(name, dict()).get('seconds')
+        base = '%10.2f' % (base * 1000) if base is not None else '%10s' % '-'
+        lines.append('%-48s %10.2f %s %10.2f %10.1f' % (
+            name, cur['seconds'] * 1000, base, cur['peak_bytes'] / (1024 * 1024),
+            cur['onnx_bytes'] / 1024))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the conversion performance")
+    parser.add_argument('--model-dir', action='append', default=[],
+                        help="Directory of more TFLite models to benchmark, can be repeated")
+    parser.add_argument('--synthetic', type=int, action='append', default=[],
+                        help="Benchmark synthetic models of this many operators, can be repeated")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="Path of the baseline (default: %(default)s)")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Save the results as the baseline rather than comparing")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Convert each model this many times for timing (default: %(default)s)")
+    parser.add_argument('--validation', default='full', choices=VALIDATION_LEVELS,
+                        help="Validation level of conversion (default: %(default)s)")
+    parser.add_argument('--time-threshold', type=float, default=0.2,
+                        help="Relative slowdown regarded as regression (default: %(default)s)")
+    parser.add_argument('--min-time-delta', type=float, default=0.005,
+                        help="Slowdown (in seconds) below which is regarded as noise\n"
+                             "(default: %(default)s)")
+    parser.add_argument('--memory-threshold', type=float, default=0.1,
+                        help="Relative peak memory growth regarded as regression\n"
+                             "(default: %(default)s)")
+    parser.add_argument('--min-memory-delta', type=int, default=256 * 1024,
+                        help="Peak memory growth (in bytes) below which is regarded as noise\n"
+                             "(default: %(default)s)")
+    parser.add_argument('--size-threshold', type=float, default=0.01,
+                        help="Relative ONNX size change regarded as regression\n"
+                             "(default: %(default)s)")
+    args = parser.parse_args()
+
+    logging.getLogger('tflite2onnx').setLevel(logging.ERROR)
+
+    models = collectModels([DEFAULT_MODEL_DIR] + args.model_dir)
+    loaders = {name: (lambda p=path: loadModel(p)) for name, path in models.items()}
+    loaders.update(synthesizeModels(args.synthetic))
+    results = dict()
+    for name, load in loaders.items():
+        try:
+            results[name] = benchmark(load(), args.repeat, args.validation)
+        except Exception as e:
+            results[name] = {'error': '%s: %s' % (type(e).__name__, e)}
+
+    baseline = dict()
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['models']
+    print(formatResults(results, baseline))
+
+    if args.update_baseline:
+        meta = {
+            'version': tflite2onnx.__version__,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump({'meta': meta, 'models': results}, f, indent=2, sort_keys=True)
+        print("Baseline saved to %s" % args.baseline)
+        return 0
+
+    if not baseline:
+        print("No baseline found at %s, record it with --update-baseline" % args.baseline)
+        return 0
+    regressions = compare(results, baseline, args)
+    for r in regressions:
+        print("Regression: %s" % r)
+    print("%d models benchmarked, %d regressions" % (len(results), len(regressions)))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
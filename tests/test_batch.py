@@ -0,0 +1,50 @@
+import os
+
+from tflite2onnx.batch import collectModels, convertBatch, formatSummary
+
+
+def _assets():
+    cur_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.abspath(cur_dir + '/../assets/tests')
+
+
+def test_collect_models(tmp_path):
+    tflm_dir = _assets()
+    abs_path = os.path.join(tflm_dir, 'abs.float32.tflite')
+    manifest = tmp_path / 'models.txt'
+    manifest.write_text("# comment\n\n%s\n%s custom.onnx\n" % (abs_path, abs_path))
+
+    models = collectModels([abs_path, os.path.join(tflm_dir, 'conv*.uint8.tflite'),
+                            str(manifest)], 'out')
+    assert(models == [
+        (abs_path, os.path.join('out', 'abs.float32.onnx')),
+        (os.path.join(tflm_dir, 'conv-relu.uint8.tflite'), os.path.join('out', 'conv-relu.uint8.onnx')),  # noqa: E501
+        (os.path.join(tflm_dir, 'conv.uint8.tflite'), os.path.join('out', 'conv.uint8.onnx')),
+        (abs_path, os.path.join('out', 'abs.float32.onnx')),
+        (abs_path, str(tmp_path / 'custom.onnx')),
+    ])
+    assert(len(collectModels([tflm_dir], 'out')) > 50)
+
+
+def test_convert_batch(tmp_path):
+    tflm_dir = _assets()
+    broken = tmp_path / 'broken.tflite'
+    broken.write_bytes(b'not a tflite model')
+    models = collectModels([os.path.join(tflm_dir, 'abs.float32.tflite'), str(broken),
+                            os.path.join(tflm_dir, 'conv.uint8.tflite')], str(tmp_path / 'out'))
+
+    results = convertBatch(models, num_workers=2)
+    assert([r.status for r in results] == ['ok', 'failed', 'ok'])
+    assert(os.path.exists(results[0].onnx_path))
+    assert(os.path.exists(results[2].onnx_path))
+    assert(results[1].error)
+    summary = formatSummary(results)
+    assert('3 models: 2 ok, 1 failed' in summary)
+
+    # the stuck worker is replaced
+    models = collectModels([os.path.join(tflm_dir, 'mobilenet_v1_0.25_128.tflite'),
+                            os.path.join(tflm_dir, 'abs.float32.tflite')], str(tmp_path / 'out'))
+    results = convertBatch(models, num_workers=1, timeout=0.01)
+    assert(results[0].status == 'timeout')
+    results = convertBatch(models[1:], num_workers=1, timeout=60)
+    assert(results[0].status == 'ok')
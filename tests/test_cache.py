@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+
+import tflite2onnx as t2o
+from tflite2onnx.cache import ConversionCache
+
+
+def _tflitePath(model_name):
+    cur_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.abspath(cur_dir + '/../assets/tests/' + model_name + '.tflite')
+
+
+def test_cache_hit(tmp_path, monkeypatch):
+    tflm_path = _tflitePath('conv.float32')
+    cache_dir = str(tmp_path / 'cache')
+    onnx_path = str(tmp_path / 'conv.onnx')
+    t2o.convert(tflm_path, onnx_path, cache_dir=cache_dir)
+    assert(len(os.listdir(cache_dir)) == 1)
+    with open(onnx_path, 'rb') as f:
+        converted = f.read()
+
+    # different options are different entries
+    t2o.convert(tflm_path, str(tmp_path / 'conv.none.onnx'), cache_dir=cache_dir,
+                validation='none')
+    assert(len(os.listdir(cache_dir)) == 2)
+
+    def noConversion(*args):
+        assert(False), "Should be a cache hit"
+    convert_module = sys.modules['tflite2onnx.convert']
+    monkeypatch.setattr(convert_module, '_convertModel', noConversion)
+    cached_path = str(tmp_path / 'conv.cached.onnx')
+    t2o.convert(tflm_path, cached_path, cache_dir=cache_dir)
+    with open(cached_path, 'rb') as f:
+        assert(f.read() == converted)
+
+
+def test_cache_eviction(tmp_path):
+    cache = ConversionCache(str(tmp_path / 'cache'), max_size=250)
+    keys = []
+    for i in range(3):
+        path = tmp_path / ('%d.onnx' % i)
+        path.write_bytes(b'0' * 100)
+        key = ConversionCache.key(b'model %d' % i, dict(), dict())
+        if i == 2:
+            # make the first one the most recently used before evicting
+            assert(cache.get(keys[0], str(tmp_path / 'hit.onnx')))
+            time.sleep(0.01)
+        cache.put(key, str(path))
+        keys.append(key)
+        time.sleep(0.01)
+
+    out = str(tmp_path / 'out.onnx')
+    assert(cache.get(keys[0], out))
+    assert(not cache.get(keys[1], out))
+    assert(cache.get(keys[2], out))
+    assert(ConversionCache.key(b'model', {'t': ('NHWC', 'NCHW')}, dict()) !=
+           ConversionCache.key(b'model', dict(), dict()))
@@ -0,0 +1,132 @@
+import numpy as np
+from onnx import TensorProto
+
+from tflite2onnx import mapping
+from tflite2onnx.constant import contentKey, deduplicateInitializers, foldConstants
+from tflite2onnx.tensor import Tensor
+
+
+class FakeOp:
+    def __init__(self, *inputs, type=None, outputs=(), attrs=None):
+        self.type = type
+        self.shorty = type
+        self.attrs = attrs or dict()
+        self.inputs = list(inputs)
+        for t in inputs:
+            t.addConsumer(self)
+        self.outputs = list(outputs)
+        for t in outputs:
+            t.addProducer(self)
+
+    def replaceInput(self, original, new):
+        self.inputs[self.inputs.index(original)] = new
+
+
+def _constant(name, data):
+    t = Tensor(None, None, -1)
+    t.name = name
+    t.dtype = TensorProto.FLOAT
+    t.data = data
+    t.shape = data.shape
+    return t
+
+
+def _activation(name, shape, dtype=TensorProto.FLOAT):
+    t = Tensor(None, None, -1)
+    t.name = name
+    t.dtype = dtype
+    t.shape = shape
+    return t
+
+
+def test_content_key():
+    a = np.arange(2000, dtype='float32')
+    b = a.copy()
+    b[1000] = -1
+    # `str()` of both is the same as numpy summarizes large arrays
+    assert(str(a) == str(b))
+    assert(contentKey(a) != contentKey(b))
+    assert(contentKey(a) == contentKey(a.copy()))
+    assert(contentKey(a) != contentKey(a.reshape(2, 1000)))
+    assert(contentKey(a) != contentKey(a.astype('int32')))
+
+
+def test_deduplicate_initializers():
+    data = np.ones((4, 4), dtype='float32')
+    t0 = _constant('t0', data)
+    t1 = _constant('t1', data.copy())
+    t2 = _constant('t2', data.T)
+    t3 = _constant('t3', np.zeros((4, 4), dtype='float32'))
+    op0 = FakeOp(t0)
+    op1 = FakeOp(t1, t3)
+    op2 = FakeOp(t2)
+    op3 = FakeOp(t0, t1)
+
+    saved = deduplicateInitializers([t0, t1, t2, t3])
+    assert(saved == data.nbytes)
+    assert(op0.inputs == [t0])
+    assert(op2.inputs == [t0])
+    assert(list(t0.consumers) == [op0, op3, op2])
+    assert(len(t2.consumers) == 0)
+    # `op3` consumes both `t0` and `t1`, which cannot be merged then
+    assert(op1.inputs == [t1, t3])
+    assert(op3.inputs == [t0, t1])
+
+
+def test_fold_constants():
+    # w -> Transpose -> Reshape -> Quantize -> Dequantize -> Conv
+    w = _constant('w', np.arange(6, dtype='float32').reshape(1, 2, 3) / 10)
+    transposed = _activation('transposed', (3, 2, 1))
+    reshaped = _activation('reshaped', (3, 2))
+    quantized = _activation('quantized', (3, 2), TensorProto.UINT8)
+    dequantized = _activation('dequantized', (3, 2))
+    shape = _constant('shape', np.array([3, 2], dtype='int64'))
+    scale = _constant('scale', np.array([0.1], dtype='float32'))
+    zero_point = _constant('zero_point', np.array([128], dtype='uint8'))
+    x = _activation('x', (3, 2))
+    y = _activation('y', (3, 2))
+    transpose = FakeOp(w, type='Transpose', outputs=[transposed], attrs={'perm': (2, 1, 0)})
+    reshape = FakeOp(transposed, shape, type='Reshape', outputs=[reshaped])
+    quantize = FakeOp(reshaped, scale, zero_point, type='QuantizeLinear', outputs=[quantized])
+    dequantize = FakeOp(quantized, scale, zero_point, type='DequantizeLinear',
+                        outputs=[dequantized])
+    conv = FakeOp(x, dequantized, type='Conv', outputs=[y])
+    # graph outputs are not folded
+    abs_output = _activation('abs', (1, 2, 3))
+    abs_op = FakeOp(w, type='Abs', outputs=[abs_output])
+
+    ops = [transpose, reshape, quantize, dequantize, abs_op, conv]
+    assert(foldConstants(ops, [y, abs_output]) == 3)
+    expected = np.array([[128, 131], [129, 132], [130, 133]], dtype='uint8')
+    assert(np.array_equal(quantized.data, expected))
+    assert(quantized.data.dtype == np.uint8)
+    assert(len(quantized.producers) == 0)
+    assert(list(quantized.consumers) == [dequantize])
+    # the intermediate ones are dropped
+    assert(len(transposed.consumers) == 0 and len(reshaped.consumers) == 0)
+    assert(list(w.consumers) == [abs_op])
+    assert(not dequantized.isInitializer and not abs_output.isInitializer)
+
+
+def test_fold_quantize_saturate():
+    for dtype, zero_point, expected in ((TensorProto.UINT8, 128, [255, 0, 138]),
+                                        (TensorProto.INT8, 0, [127, -128, 10])):
+        x = _constant('x', np.array([100.0, -100.0, 0.1], dtype='float32'))
+        scale = _constant('scale', np.array([0.01], dtype='float32'))
+        # zero point scalars are created from list as `TensorFactory._createScalarCore()`
+        zp = _constant('zero_point', np.array([zero_point]))
+        zp.data = [zero_point]
+        y = _activation('y', (3,), dtype)
+        quantize = FakeOp(x, scale, zp, type='QuantizeLinear', outputs=[y])
+        dequantize = FakeOp(y, type='DequantizeLinear', outputs=[_activation('z', (3,))])
+
+        assert(foldConstants([quantize, dequantize], []) == 1)
+        assert(y.data.tolist() == expected)
+        assert(y.data.dtype == mapping.DTYPE_ONNX2NAME[dtype])
+
+
+if __name__ == '__main__':
+    test_content_key()
+    test_deduplicate_initializers()
+    test_fold_constants()
+    test_fold_quantize_saturate()
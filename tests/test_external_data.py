@@ -0,0 +1,43 @@
+import os
+import logging
+
+import onnx
+import shrub
+import tflite2onnx as t2o
+
+shrub.util.formatLogging(logging.DEBUG)
+
+
+def end2end_test(model_name, use_layout, **kwargs):
+    cur_dir = os.path.dirname(os.path.abspath(__file__))
+    tflm_dir = os.path.abspath(cur_dir + '/../assets/tests')
+    tflm_name = model_name + '.tflite'
+    onnx_name = model_name + '.onnx'
+    tflm_path = os.path.join(tflm_dir, tflm_name)
+    t2o.convert(tflm_path, onnx_name, external_data=True, **kwargs)
+
+    # initializers are saved externally and aligned
+    alignment = kwargs.get('alignment', 4096)
+    m = onnx.load(onnx_name, load_external_data=False)
+    externals = [t for t in m.graph.initializer if t.data_location == onnx.TensorProto.EXTERNAL]
+    assert(len(externals) > 0)
+    for t in externals:
+        info = {e.key: e.value for e in t.external_data}
+        assert(int(info['offset']) % alignment == 0)
+
+    m = shrub.tflite.parse(tflm_path)
+    m.genInput()
+
+    onnx_ret = shrub.onnx.run(onnx_name, m.inputs, use_layout)
+    tflite_ret = shrub.tflite.run(tflm_path, m.inputs)
+    assert(shrub.network.cmpTensors(onnx_ret, tflite_ret, useLayout=use_layout))
+
+
+def test_external_data():
+    end2end_test('mobilenet_v1_0.25_128', 'NCHW')
+    end2end_test('mobilenet_v1_0.25_128', 'NCHW', size_threshold=512, alignment=64)
+    end2end_test('mobilenet_v1_0.25_128', 'NCHW', max_file_size=64 * 1024)
+
+
+if __name__ == '__main__':
+    test_external_data()
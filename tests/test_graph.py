@@ -0,0 +1,90 @@
+from tflite2onnx.graph import GraphIndex, sortOperators
+
+
+def _chain(ops, tensors):
+    """Link `ops[i] -> tensors[i] -> ops[i + 1]`."""
+    for op, t, next_op in zip(ops, tensors, ops[1:]):
+        op.outputs.append(t)
+        t.producers.append(op)
+        next_op.inputs.append(t)
+        t.consumers.append(next_op)
+
+
+class FakeOp:
+    def __init__(self, name):
+        self.name = name
+        self.inputs = []
+        self.outputs = []
+
+
+class FakeTensor:
+    def __init__(self):
+        self.producers = []
+        self.consumers = []
+
+
+def _fakeOps(count):
+    ops = [FakeOp(i) for i in range(count)]
+    tensors = [FakeTensor() for i in range(count)]
+    return ops, tensors
+
+
+def test_graph_index():
+    index = GraphIndex()
+    op1, op2 = object(), object()
+    t1, t2 = object(), object()
+
+    index.link(t1, op1)
+    index.link(t2, op1)
+    index.link(t2, op2)
+    assert(list(index.ops) == [op1, op2])
+    assert(list(index.tensors) == [t1, t2])
+
+    version = index.op_version
+    index.unlink(t2, op1)
+    assert(list(index.tensors) == [t1, t2])
+    assert(index.op_version == version)
+
+    index.unlink(t2, op2)
+    assert(list(index.ops) == [op1])
+    assert(list(index.tensors) == [t1])
+    assert(index.op_version == version + 1)
+
+
+def test_sort_operators():
+    ops, tensors = _fakeOps(4)
+    _chain([ops[2], ops[0], ops[3]], tensors)
+    # op 1 is independent, stable w.r.t. the given order
+    ordered = sortOperators(ops)
+    assert([op.name for op in ordered] == [1, 2, 0, 3])
+
+    # deep chain doesn't hit recursion limit
+    ops, tensors = _fakeOps(100000)
+    _chain(list(reversed(ops)), tensors)
+    ordered = sortOperators(ops)
+    assert(ordered == list(reversed(ops)))
+
+    # cycle
+    ops, tensors = _fakeOps(2)
+    _chain([ops[0], ops[1], ops[0]], tensors)
+    try:
+        sortOperators(ops)
+        assert(False), "Cycle should be detected"
+    except ValueError:
+        pass
+
+
+def test_compact_ir():
+    import tflite2onnx.op  # noqa: F401, registers the operators
+    from tflite2onnx.op.common import OpFactory
+    from tflite2onnx.op.binary import PowerWrapper
+    from tflite2onnx.tensor import Tensor
+    # no per-object `__dict__` for the slotted IR classes
+    for cls in set(OpFactory.registry.values()) | {PowerWrapper, Tensor}:
+        assert(cls.__dictoffset__ == 0), cls.__name__
+
+
+if __name__ == '__main__':
+    test_graph_index()
+    test_sort_operators()
+    test_compact_ir()
@@ -19,6 +19,23 @@ def test_getPerm():
     assert(getPerm('0123', '3021') == [3, 0, 2, 1])
 
 
+def test_layout():
+    import copy
+    from tflite2onnx.layout import Layout
+    layout = Layout('NHWC', 'NCHW')
+    assert(layout is Layout('NHWC', 'NCHW'))
+    assert(layout is copy.deepcopy(layout))
+    assert(layout.perm == (0, 3, 1, 2))
+    assert(layout.inversePerm == (0, 2, 3, 1))
+    assert(layout.inverse is Layout('NCHW', 'NHWC'))
+    assert(layout.transform([1, 6, 8, 2]) == [1, 2, 6, 8])
+    try:
+        layout.source = 'NCHW'
+        assert(False)
+    except AttributeError:
+        pass
+
+
 def test_align_dimension():
     from tflite2onnx.op.binary import alignDimension
     # cases from: https://github.com/onnx/onnx/blob/master/docs/Broadcasting.md
@@ -32,4 +49,5 @@ def test_align_dimension():
 if __name__ == '__main__':
     test_transform()
     test_getPerm()
+    test_layout()
     test_align_dimension()
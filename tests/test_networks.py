@@ -1,19 +1,20 @@
 import os
 import logging
 
+import onnx
 import shrub
 import tflite2onnx as t2o
 
 shrub.util.formatLogging(logging.DEBUG)
 
 
-def end2end_test(model_name, use_layout):
+def end2end_test(model_name, use_layout, **kwargs):
     cur_dir = os.path.dirname(os.path.abspath(__file__))
     tflm_dir = os.path.abspath(cur_dir + '/../assets/tests')
     tflm_name = model_name + '.tflite'
     onnx_name = model_name + '.onnx'
     tflm_path = os.path.join(tflm_dir, tflm_name)
-    t2o.convert(tflm_path, onnx_name)
+    t2o.convert(tflm_path, onnx_name, **kwargs)
 
     m = shrub.tflite.parse(tflm_path)
     m.genInput()
@@ -32,5 +33,58 @@ def test_networks():
         end2end_test(net, 'NCHW')
 
 
+def test_networks_mmap():
+    NETWORK_LIST = (
+        'mobilenet_v1_0.25_128',
+    )
+
+    for net in NETWORK_LIST:
+        end2end_test(net, 'NCHW', use_mmap=True)
+
+
+def test_validation_levels():
+    for level in ('none', 'final-only', 'full'):
+        end2end_test('mobilenet_v1_0.25_128', 'NCHW', validation=level)
+
+
+def test_convert_buffer():
+    cur_dir = os.path.dirname(os.path.abspath(__file__))
+    tflm_dir = os.path.abspath(cur_dir + '/../assets/tests')
+    tflm_path = os.path.join(tflm_dir, 'mobilenet_v1_0.25_128.tflite')
+    onnx_name = 'mobilenet_v1_0.25_128.buffer.onnx'
+    with open(tflm_path, 'rb') as f:
+        buf = f.read()
+
+    om = t2o.convert_buffer(memoryview(buf))
+    assert(isinstance(om, onnx.ModelProto))
+    serialized = t2o.convert_buffer(buf, serialize=True)
+    assert(isinstance(serialized, bytes))
+    with open(onnx_name, 'wb') as f:
+        f.write(serialized)
+
+    m = shrub.tflite.parse(tflm_path)
+    m.genInput()
+
+    onnx_ret = shrub.onnx.run(onnx_name, m.inputs, 'NCHW')
+    tflite_ret = shrub.tflite.run(tflm_path, m.inputs)
+    assert(shrub.network.cmpTensors(onnx_ret, tflite_ret, useLayout='NCHW'))
+
+
+def test_num_threads():
+    cur_dir = os.path.dirname(os.path.abspath(__file__))
+    tflm_dir = os.path.abspath(cur_dir + '/../assets/tests')
+    for net in ('mobilenet_v1_0.25_128', 'mobilenet_v1_0.25_128_quant'):
+        with open(os.path.join(tflm_dir, net + '.tflite'), 'rb') as f:
+            buf = f.read()
+        serial = t2o.convert_buffer(buf, serialize=True)
+        parallel = t2o.convert_buffer(buf, serialize=True, num_threads=4)
+        assert(serial == parallel)
+    end2end_test('mobilenet_v1_0.25_128', 'NCHW', num_threads=4)
+
+
 if __name__ == '__main__':
     test_networks()
+    test_networks_mmap()
+    test_validation_levels()
+    test_convert_buffer()
+    test_num_threads()
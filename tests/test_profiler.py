@@ -0,0 +1,55 @@
+import os
+
+import tflite2onnx as t2o
+
+
+def test_profiler():
+    cur_dir = os.path.dirname(os.path.abspath(__file__))
+    tflm_path = os.path.abspath(cur_dir + '/../assets/tests/conv-relu.uint8.tflite')
+    with open(tflm_path, 'rb') as f:
+        buf = f.read()
+
+    profiler = t2o.Profiler()
+    t2o.convert_buffer(buf, profiler=profiler)
+    stats = profiler.asDict()
+    for phase in ('parse', 'propagate layout', 'translate quantization', 'validate',
+                  'convert operators', 'check tensors', 'make graph', 'make model',
+                  'check model'):
+        assert(stats['phases'][phase]['count'] == 1), phase
+        assert(stats['phases'][phase]['seconds'] >= 0)
+    assert(stats['operators']['Conv']['parse']['count'] == 1)
+    assert(stats['operators']['Conv']['convert']['count'] == 1)
+    assert(stats['operators']['Relu']['convert']['count'] == 1)
+    assert('Conv' in profiler.report())
+
+    profiler = t2o.Profiler()
+    t2o.convert(tflm_path, 'conv-relu.uint8.profile.onnx', profiler=profiler,
+                validation='none')
+    assert('validate' not in profiler.phases)
+    assert(profiler.phases['save'][1] == 1)
+
+
+def test_profiler_memory():
+    cur_dir = os.path.dirname(os.path.abspath(__file__))
+    tflm_path = os.path.abspath(cur_dir + '/../assets/tests/mobilenet_v1_0.25_128_quant.tflite')
+    with open(tflm_path, 'rb') as f:
+        buf = f.read()
+
+    profiler = t2o.Profiler(memory=True, top_tensors=3)
+    t2o.convert_buffer(buf, profiler=profiler)
+    stats = profiler.asDict()
+    total = stats['phases']['total']
+    for name, phase in stats['phases'].items():
+        assert(0 < phase['peak_bytes'] <= total['peak_bytes']), name
+        assert(0 <= phase['rss_growth_bytes'] <= total['rss_growth_bytes']), name
+    # float32 weights dequantized from uint8
+    assert(stats['phases']['translate quantization']['peak_bytes'] > 1001 * 256 * 4)
+    # weights are kept in uint8 as the quantizing is folded
+    assert([t['bytes'] for t in stats['tensors']] == [1001 * 256, 256 * 256, 256 * 128])
+    assert(stats['tensors'][0]['shape'] == [1001, 256, 1, 1])
+    assert('Peak(MB)' in profiler.report())
+
+
+if __name__ == '__main__':
+    test_profiler()
+    test_profiler_memory()
@@ -2,20 +2,28 @@ import copy
 import os
 import logging
 
+import numpy as np
+import onnx
 import shrub
+import tflite
 import tflite2onnx as t2o
+from tflite2onnx.synthetic import ModelBuilder
 
 shrub.util.formatLogging(logging.DEBUG)
 
 
-def end2end_test(model_name, use_layout, atol, rtol):
+def end2end_test(model_name, use_layout, atol, rtol, integer_ops=False):
     cur_dir = os.path.dirname(os.path.abspath(__file__))
     tflm_dir = os.path.abspath(cur_dir + '/../assets/tests')
     tflm_name = model_name + '.tflite'
-    onnx_name = model_name + '.onnx'
+    onnx_name = model_name + ('.integer.onnx' if integer_ops else '.onnx')
     tflm_path = os.path.join(tflm_dir, tflm_name)
-    t2o.convert(tflm_path, onnx_name)
+    t2o.convert(tflm_path, onnx_name, integer_ops=integer_ops)
+    compare(tflm_path, onnx_name, use_layout, atol, rtol)
+    return onnx.load(onnx_name)
 
+
+def compare(tflm_path, onnx_name, use_layout, atol, rtol):
     m = shrub.tflite.parse(tflm_path)
     m.genInput()
 
@@ -62,6 +70,51 @@ def test_quantized_networks():
         end2end_test(net, 'NCHW', 1, 1e-5)
 
 
+def _opTypes(om):
+    return [n.op_type for n in om.graph.node]
+
+
+def test_integer_ops():
+    for op in ('conv.uint8', 'conv-relu.uint8', 'depthwise-conv.uint8'):
+        om = end2end_test(op, 'NCHW', 1e-7, 1e-5, integer_ops=True)
+        assert('QLinearConv' in _opTypes(om) and 'Conv' not in _opTypes(om))
+        # weights and bias are kept as they are in TFLite
+        dtypes = {t.data_type for t in om.graph.initializer if len(t.dims) > 0}
+        assert(dtypes == {onnx.TensorProto.UINT8, onnx.TensorProto.INT32})
+
+    om = end2end_test('mobilenet_v1_0.25_128_quant', 'NCHW', 1, 1e-5, integer_ops=True)
+    assert('Conv' not in _opTypes(om))
+    assert(_opTypes(om).count('QLinearConv') == 28)
+
+
+def test_integer_ops_fully_connected(tmp_path):
+    xs, ws = 0.02, 0.005
+    b = ModelBuilder()
+    x = b.addTensor('input', (1, 16), 'uint8', quant=(xs, 128))
+    w = b.addTensor('weight', (8, 16), 'uint8', np.random.randint(0, 256, (8, 16)),
+                    quant=(ws, 120))
+    bias = b.addTensor('bias', (8,), 'int32', np.random.randint(-2000, 2000, (8,)),
+                       quant=(xs * ws, 0))
+    y = b.addTensor('output', (1, 8), 'uint8', quant=(0.1, 100))
+    b.inputs.append(x)
+    b.outputs.append(y)
+    b.addOperator(tflite.BuiltinOperator.FULLY_CONNECTED, [x, w, bias], [y],
+                  ('FullyConnectedOptions', dict()))
+    tflm_path = str(tmp_path / 'fc.uint8.tflite')
+    onnx_path = str(tmp_path / 'fc.uint8.onnx')
+    with open(tflm_path, 'wb') as f:
+        f.write(b.build())
+
+    t2o.convert(tflm_path, onnx_path, integer_ops=True)
+    compare(tflm_path, onnx_path, 'NCHW', 1e-7, 1e-5)
+    assert('MatMulInteger' in _opTypes(onnx.load(onnx_path)))
+
+
 if __name__ == '__main__':
+    import pathlib
+    import tempfile
     test_quantized_ops()
     test_quantized_networks()
+    test_integer_ops()
+    with tempfile.TemporaryDirectory() as d:
+        test_integer_ops_fully_connected(pathlib.Path(d))
@@ -0,0 +1,156 @@
+import os
+
+import numpy as np
+import onnx
+import shrub
+import tflite
+from onnx import TensorProto
+
+import tflite2onnx as t2o
+from tflite2onnx.rewrite import Constant, Pattern, Value
+from tflite2onnx.synthetic import ModelBuilder
+from tflite2onnx.tensor import Tensor
+
+BO = tflite.BuiltinOperator
+
+
+class FakeOp:
+    def __init__(self, type, inputs, outputs):
+        self.type = type
+        self.inputs = list(inputs)
+        for t in inputs:
+            t.addConsumer(self)
+        self.outputs = list(outputs)
+        for t in outputs:
+            t.addProducer(self)
+
+
+def _tensor(name, data=None):
+    t = Tensor(None, None, -1)
+    t.name = name
+    t.dtype = TensorProto.FLOAT
+    t.data = data
+    t.shape = (2, 2)
+    return t
+
+
+def test_pattern():
+    x = _tensor('x')
+    s = _tensor('s')
+    minus_one = _tensor('minus_one', np.full((2, 2), -1, dtype='float32'))
+    two = _tensor('two', np.full((2, 2), 2, dtype='float32'))
+    y0 = _tensor('y0')
+    y1 = _tensor('y1')
+    sqrt = FakeOp('Sqrt', [x], [s])
+    pow0 = FakeOp('Pow', [s, minus_one], [y0])
+    pow1 = FakeOp('Pow', [s, two], [y1])
+
+    pattern = Pattern('Pow', Pattern('Sqrt', Value('x'), name='sqrt'), Constant('e', -1))
+    captures = dict()
+    assert(pattern.match(pow0, captures))
+    assert(captures == {'x': x, 'sqrt': sqrt, 'e': minus_one})
+    assert(not pattern.match(pow1, dict()))
+    assert(not pattern.match(sqrt, dict()))
+    # input is not a constant
+    pow2 = FakeOp('Pow', [x, s], [_tensor('y2')])
+    assert(not Pattern('Pow', Value(), Constant()).match(pow2, dict()))
+
+
+def test_rewrite_rsqrt():
+    cur_dir = os.path.dirname(os.path.abspath(__file__))
+    tflm_path = os.path.abspath(cur_dir + '/../assets/tests/abs-add-rsqrt.float32.tflite')
+    with open(tflm_path, 'rb') as f:
+        m = t2o.convert_buffer(f.read())
+    # the full-shape exponent of `Pow(Sqrt(x), -1)` is not needed
+    assert([n.op_type for n in m.graph.node] == ['Abs', 'Add', 'Sqrt', 'Reciprocal'])
+    assert([t.name for t in m.graph.initializer] == ['filter_low'])
+
+
+def _pad(b, x, pads, name):
+    shape = tuple(d + sum(p) for d, p in zip(b.tensors[x][1], pads))
+    pt = b.addTensor(name + '/paddings', (4, 2), 'int32', np.array(pads))
+    y = b.addTensor(name + '/output', shape)
+    b.addOperator(BO.PAD, [x, pt], [y], ('PadOptions', dict()))
+    return y, shape
+
+
+def _pool(b, opcode, x, shape, padding, name):
+    oshape = shape if padding == tflite.Padding.SAME else \
+        (shape[0], shape[1] - 2, shape[2] - 2, shape[3])
+    y = b.addTensor(name + '/output', oshape)
+    b.addOperator(opcode, [x], [y], ('Pool2DOptions', {
+        'Padding': padding, 'StrideW': 1, 'StrideH': 1, 'FilterWidth': 3, 'FilterHeight': 3}))
+    return y
+
+
+def _end2end(b, tmp_path):
+    tflm_path = str(tmp_path / 'model.tflite')
+    onnx_path = str(tmp_path / 'model.onnx')
+    with open(tflm_path, 'wb') as f:
+        f.write(b.build())
+    t2o.convert(tflm_path, onnx_path)
+
+    m = shrub.tflite.parse(tflm_path)
+    m.genInput()
+    onnx_ret = shrub.onnx.run(onnx_path, m.inputs, 'NCHW')
+    tflite_ret = shrub.tflite.run(tflm_path, m.inputs)
+    assert(shrub.network.cmpTensors(onnx_ret, tflite_ret, useLayout='NCHW'))
+    return onnx.load(onnx_path)
+
+
+def test_fold_pad(tmp_path):
+    S, C = 6, 4
+    pads = [[0, 0], [1, 2], [2, 1], [0, 0]]
+    b = ModelBuilder()
+    x = b.addTensor('input', (1, S, S, C))
+    b.inputs.append(x)
+
+    # Conv of VALID padding
+    padded, shape = _pad(b, x, pads, 'pad_conv')
+    w = b.addTensor('weight', (C, 3, 3, C), 'float32', np.random.rand(C, 3, 3, C))
+    bias = b.addTensor('bias', (C,), 'float32', np.random.rand(C))
+    conv = b.addTensor('conv', (1, S + 1, S + 1, C))
+    b.addOperator(BO.CONV_2D, [padded, w, bias], [conv],
+                  ('Conv2DOptions', {'Padding': tflite.Padding.VALID, 'StrideW': 1, 'StrideH': 1}))
+    b.outputs.append(conv)
+
+    # AveragePool of VALID padding, of which the pads are counted then
+    padded, shape = _pad(b, x, pads, 'pad_avg')
+    b.outputs.append(_pool(b, BO.AVERAGE_POOL_2D, padded, shape, tflite.Padding.VALID, 'avg'))
+
+    # MaxPool after Relu, and the other not
+    relu = b.addTensor('relu', (1, S, S, C))
+    b.addOperator(BO.RELU, [x], [relu])
+    # the pads and the ones of SAME are less than the kernel
+    pads = [[0, 0], [1, 0], [0, 1], [0, 0]]
+    padded, shape = _pad(b, relu, pads, 'pad_max')
+    b.outputs.append(_pool(b, BO.MAX_POOL_2D, padded, shape, tflite.Padding.SAME, 'max'))
+
+    om = _end2end(b, tmp_path)
+    assert(all(n.op_type != 'Pad' for n in om.graph.node))
+    nodes = {n.output[0]: n for n in om.graph.node}
+    for name, expected in (('conv', [1, 2, 2, 1]), ('avg/output', [1, 2, 2, 1]),
+                           ('max/output', [2, 1, 1, 2])):
+        attrs = {a.name: a for a in nodes[name].attribute}
+        assert(list(attrs['pads'].ints) == expected), name
+    attrs = {a.name: a for a in nodes['avg/output'].attribute}
+    assert(attrs['count_include_pad'].i == 1)
+
+    # MaxPool ignores its pads as -inf, which differs from padded zeros if
+    # the input can be negative, so the Pad is kept
+    b = ModelBuilder()
+    x = b.addTensor('input', (1, S, S, C))
+    b.inputs.append(x)
+    padded, shape = _pad(b, x, pads, 'pad')
+    b.outputs.append(_pool(b, BO.MAX_POOL_2D, padded, shape, tflite.Padding.SAME, 'max'))
+    om = t2o.convert_buffer(b.build())
+    assert([n.op_type for n in om.graph.node] == ['Pad', 'MaxPool'])
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    test_pattern()
+    test_rewrite_rsqrt()
+    with tempfile.TemporaryDirectory() as d:
+        test_fold_pad(pathlib.Path(d))
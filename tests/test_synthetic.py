@@ -0,0 +1,32 @@
+import pytest
+
+import tflite
+import tflite2onnx as t2o
+from tflite2onnx import synthetic
+
+
+def test_synthetic_blocks():
+    for quantized in (False, True):
+        for block in synthetic.BLOCKS:
+            buf = synthetic.generate(8, mix=(block,), channels=4, size=4, fan_out=2,
+                                     quantized=quantized)
+            im = tflite.Model.GetRootAsModel(buf, 0)
+            assert(im.Subgraphs(0).OperatorsLength() >= 8)
+            m = t2o.convert_buffer(buf)
+            if block != 'reshape':
+                # the chain of reshapes is optimized out
+                assert(len(m.graph.node) >= 8)
+
+
+def test_synthetic_reproducible():
+    buf = synthetic.generate(20, channels=4, size=4)
+    assert(buf == synthetic.generate(20, channels=4, size=4))
+    assert(buf != synthetic.generate(20, channels=4, size=4, seed=1))
+
+    with pytest.raises(ValueError):
+        synthetic.generate(20, mix=('unknown',))
+
+
+if __name__ == '__main__':
+    test_synthetic_blocks()
+    test_synthetic_reproducible()
@@ -0,0 +1,89 @@
+import logging
+
+import numpy as np
+import onnx
+import shrub
+import tflite
+import tflite2onnx as t2o
+from tflite2onnx.synthetic import ModelBuilder
+
+shrub.util.formatLogging(logging.DEBUG)
+
+BO = tflite.BuiltinOperator
+
+
+def _conv(b, x, channels, size, name):
+    w = b.addTensor(name + '/weight', (channels, 1, 1, channels), 'float32',
+                    np.random.rand(channels, 1, 1, channels))
+    bias = b.addTensor(name + '/bias', (channels,), 'float32', np.random.rand(channels))
+    y = b.addTensor(name + '/output', (1, size, size, channels))
+    b.addOperator(BO.CONV_2D, [x, w, bias], [y],
+                  ('Conv2DOptions', {'Padding': tflite.Padding.SAME, 'StrideW': 1, 'StrideH': 1}))
+    return y
+
+
+def _reshape(b, x, shape, name):
+    st = b.addTensor(name + '/shape', (len(shape),), 'int32', shape)
+    y = b.addTensor(name + '/output', shape)
+    b.addOperator(BO.RESHAPE, [x, st], [y], ('ReshapeOptions', dict()))
+    return y
+
+
+def _end2end(b, tmp_path):
+    tflm_path = str(tmp_path / 'model.tflite')
+    onnx_path = str(tmp_path / 'model.onnx')
+    with open(tflm_path, 'wb') as f:
+        f.write(b.build())
+    t2o.convert(tflm_path, onnx_path)
+
+    m = shrub.tflite.parse(tflm_path)
+    m.genInput()
+    onnx_ret = shrub.onnx.run(onnx_path, m.inputs, 'NCHW')
+    tflite_ret = shrub.tflite.run(tflm_path, m.inputs)
+    assert(shrub.network.cmpTensors(onnx_ret, tflite_ret, useLayout='NCHW'))
+    return onnx.load(onnx_path)
+
+
+def _count(om, op_type):
+    return sum(1 for n in om.graph.node if n.op_type == op_type)
+
+
+def test_transpose_cancel(tmp_path):
+    # Conv -> Reshape -> Reshape -> Relu -> Conv, the reshapes round trip
+    S, C = 4, 6
+    b = ModelBuilder()
+    x = b.addTensor('input', (1, S, S, C))
+    b.inputs.append(x)
+    c1 = _conv(b, x, C, S, 'conv1')
+    r1 = _reshape(b, c1, (1, S * S, C), 'reshape1')
+    r2 = _reshape(b, r1, (1, S, S, C), 'reshape2')
+    relu = b.addTensor('relu', (1, S, S, C))
+    b.addOperator(BO.RELU, [r2], [relu])
+    b.outputs.append(_conv(b, relu, C, S, 'conv2'))
+
+    om = _end2end(b, tmp_path)
+    assert(_count(om, 'Transpose') == 0)
+    assert(_count(om, 'Reshape') == 0)
+
+
+def test_transpose_sink(tmp_path):
+    # Mul(Add(Reshape(x), Reshape(Abs(x))), const) -> {Conv, Reshape}
+    S, C = 4, 6
+    b = ModelBuilder()
+    x = b.addTensor('input', (1, S * S, C))
+    b.inputs.append(x)
+    ra = _reshape(b, x, (1, S, S, C), 'reshape_a')
+    ab = b.addTensor('abs', (1, S * S, C))
+    b.addOperator(BO.ABS, [x], [ab])
+    rb = _reshape(b, ab, (1, S, S, C), 'reshape_b')
+    add = b.addTensor('add', (1, S, S, C))
+    b.addOperator(BO.ADD, [ra, rb], [add], ('AddOptions', dict()))
+    k = b.addTensor('k', (1, 1, 1, C), 'float32', np.random.rand(1, 1, 1, C))
+    mul = b.addTensor('mul', (1, S, S, C))
+    b.addOperator(BO.MUL, [add, k], [mul], ('MulOptions', dict()))
+    b.outputs.append(_conv(b, mul, C, S, 'conv'))
+    b.outputs.append(_reshape(b, mul, (1, S * S, C), 'reshape_c'))
+
+    om = _end2end(b, tmp_path)
+    # three transposes around the reshapes are sunk into one before Conv
+    assert(_count(om, 'Transpose') == 1)
@@ -1,6 +1,7 @@
 """Converting TensorFlow Lite models (*.tflite) to ONNX models (*.onnx)"""
 
-from tflite2onnx.convert import convert
+from tflite2onnx.convert import convert, convert_buffer
+from tflite2onnx.profiler import Profiler
 from tflite2onnx.utils import enableDebugLog, getSupportedOperators
 
 # package metadata
@@ -10,6 +11,8 @@ DESCRIPTION = "Convert TensorFlow Lite models to ONNX"
 
 __all__ = [
     convert,
+    convert_buffer,
+    Profiler,
     enableDebugLog,
     getSupportedOperators,
     __name__,
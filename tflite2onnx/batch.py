@@ -0,0 +1,289 @@
+import argparse
+import glob
+import logging
+import multiprocessing
+import os
+import time
+import traceback
+from collections import deque
+from multiprocessing.connection import wait
+
+import tflite2onnx
+from tflite2onnx.common import VALIDATION_LEVELS
+from tflite2onnx.convert import convert
+
+logger = logging.getLogger('tflite2onnx')
+
+
+class BatchResult:
+    """The result of converting one model in a batch."""
+    def __init__(self, tflite_path, onnx_path):
+        self.tflite_path = tflite_path
+        self.onnx_path = onnx_path
+        self.status = 'pending'  # one of `pending`, `ok`, `failed`, `timeout` and `crashed`
+        self.seconds = 0.0
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.status == 'ok'
+
+    def __str__(self):
+        return '%s: %s (%.2fs)' % (self.tflite_path, self.status, self.seconds)
+
+
+def collectModels(inputs, output_dir):
+    """Collect `(tflite_path, onnx_path)` pairs to convert from `inputs`.
+
+    Each input can be a directory (all `*.tflite` files in it), a TFLite
+    model, a glob pattern or a manifest file. A manifest lists one model per
+    line, optionally followed by the ONNX path, relative to the manifest.
+    Lines starting with `#` are ignored. Unless given in the manifest, the
+    ONNX model is put in `output_dir` with the name of the TFLite model.
+    """
+    def onnxPath(tflite_path):
+        name = os.path.splitext(os.path.basename(tflite_path))[0] + '.onnx'
+        return os.path.join(output_dir, name)
+
+    models = []
+    for i in inputs:
+        if os.path.isdir(i):
+            paths = sorted(glob.glob(os.path.join(i, '*.tflite')))
+            models.extend((p, onnxPath(p)) for p in paths)
+        elif any(c in i for c in '*?['):
+            paths = sorted(glob.glob(i))
+            if len(paths) == 0:
+                raise ValueError("No model found for %s!" % i)
+            models.extend((p, onnxPath(p)) for p in paths)
+        elif i.endswith('.tflite'):
+            models.append((i, onnxPath(i)))
+        elif os.path.isfile(i):
+            models.extend(_parseManifest(i, onnxPath))
+        else:
+            raise ValueError("Invalid input %s, not a model, directory or manifest!" % i)
+    return models
+
+
+def _parseManifest(manifest, onnxPath):
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    models = []
+    with open(manifest) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 0 or fields[0].startswith('#'):
+                continue
+            if len(fields) > 2:
+                raise ValueError("Invalid line in manifest %s: %s" % (manifest, line))
+            tflite_path = os.path.join(base_dir, fields[0])
+            if len(fields) == 2:
+                onnx_path = os.path.join(base_dir, fields[1])
+            else:
+                onnx_path = onnxPath(tflite_path)
+            models.append((tflite_path, onnx_path))
+    return models
+
+
+def _limitMemory(memory_limit):
+    try:
+        import resource
+    except ImportError:
+        logger.warning("Memory limit is not supported on this platform, ignored")
+        return
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def _workerMain(conn, memory_limit, options):
+    """Convert the models sent from `conn` until `None`, reporting back to `conn`."""
+    if memory_limit:
+        _limitMemory(memory_limit)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        tflite_path, onnx_path = task
+        try:
+            convert(tflite_path, onnx_path, **options)
+            conn.send(('ok', None))
+        except MemoryError:
+            conn.send(('failed', "MemoryError: exceeded the memory limit"))
+        except Exception as e:
+            logger.debug(traceback.format_exc())
+            conn.send(('failed', '%s: %s' % (type(e).__name__, e)))
+
+
+class _Worker:
+    """A worker process, which can be killed and replaced if stuck."""
+    def __init__(self, ctx, memory_limit, options):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_workerMain, args=(child_conn, memory_limit, options),
+                                   daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.result = None
+        self.started = None
+
+    def assign(self, result):
+        self.result = result
+        self.started = time.monotonic()
+        self.conn.send((result.tflite_path, result.onnx_path))
+
+    def finish(self, status, error=None):
+        result = self.result
+        result.status = status
+        result.error = error
+        result.seconds = time.monotonic() - self.started
+        self.result = None
+        self.started = None
+        return result
+
+    def stop(self, kill=False):
+        if not kill:
+            try:
+                self.conn.send(None)
+                self.process.join(1)
+            except (BrokenPipeError, OSError):
+                pass
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def convertBatch(models, num_workers=None, timeout=None, memory_limit=None, **options):
+    """Convert `models`, pairs of `(tflite_path, onnx_path)`, on a pool of worker processes.
+
+    Each worker converts models one after another, such that the imports are
+    paid once per worker rather than once per model. A model that fails
+    doesn't stop the others. A worker is killed and replaced if converting a
+    model takes more than `timeout` seconds, or if it crashes. With
+    `memory_limit` (in bytes), the address space of workers is capped.
+    Other `options` are passed to `convert()`.
+
+    Returns `BatchResult` of the models, in the order of `models`.
+    """
+    results = [BatchResult(t, o) for t, o in models]
+    if len(results) == 0:
+        return results
+    num_workers = num_workers or os.cpu_count() or 1
+    num_workers = min(num_workers, len(results))
+    for r in results:
+        out_dir = os.path.dirname(os.path.abspath(r.onnx_path))
+        os.makedirs(out_dir, exist_ok=True)
+
+    ctx = multiprocessing.get_context()
+
+    def newWorker():
+        return _Worker(ctx, memory_limit, options)
+
+    pending = deque(results)
+    workers = [newWorker() for i in range(num_workers)]
+    try:
+        while pending or any(w.result for w in workers):
+            for w in workers:
+                if w.result is None and pending:
+                    w.assign(pending.popleft())
+            _waitWorkers([w for w in workers if w.result is not None], timeout)
+            for i, w in enumerate(workers):
+                if _reapWorker(w, timeout):
+                    workers[i] = newWorker()
+    finally:
+        for w in workers:
+            w.stop(kill=w.result is not None)
+
+    return results
+
+
+def _reapWorker(w, timeout):
+    """Kill the worker if it has crashed or timed out, return whether it is killed."""
+    if w.result is None:
+        return False
+    if not w.process.is_alive():
+        # the worker died before reporting
+        r = w.finish('crashed', "Worker exited with %s" % w.process.exitcode)
+        logger.warning("Converting %s crashed", r.tflite_path)
+    elif timeout and time.monotonic() - w.started > timeout:
+        r = w.finish('timeout', "Timeout after %s seconds" % timeout)
+        logger.warning("Converting %s timed out", r.tflite_path)
+    else:
+        return False
+    w.stop(kill=True)
+    return True
+
+
+def _waitWorkers(busy, timeout):
+    """Wait for the `busy` workers to report or the earliest deadline, collecting results."""
+    if timeout:
+        now = time.monotonic()
+        wait_time = max(0, min(w.started + timeout for w in busy) - now)
+    else:
+        wait_time = None
+    sentinels = {w.process.sentinel: w for w in busy}
+    conns = {w.conn: w for w in busy}
+    for ready in wait(list(conns) + list(sentinels), wait_time):
+        w = conns.get(ready)
+        if w is None or w.result is None:
+            continue
+        try:
+            status, error = w.conn.recv()
+        except EOFError:
+            continue
+        r = w.finish(status, error)
+        logger.info("Converted %s: %s", r.tflite_path, r.status)
+
+
+def formatSummary(results):
+    """Format `results` as a table, with a line of the counts of each status."""
+    rows = [('Status', 'Time(s)', 'Model', 'Error')]
+    for r in results:
+        rows.append((r.status, '%.2f' % r.seconds, r.tflite_path, r.error or ''))
+    widths = [max(len(row[i]) for row in rows) for i in range(3)]
+
+    lines = []
+    for row in rows:
+        cells = [row[i].ljust(widths[i]) for i in range(3)] + [row[3]]
+        lines.append('  '.join(cells).rstrip())
+    counts = dict()
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    total = ', '.join('%d %s' % (c, s) for s, c in counts.items())
+    lines.append("%d models: %s" % (len(results), total))
+    return '\n'.join(lines)
+
+
+def cmd_batch():
+    description = ("tflite2onnx " + tflite2onnx.__version__ + ", " + tflite2onnx.DESCRIPTION +
+                   ", in batch")
+    parser = argparse.ArgumentParser(description=description,
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('inputs', nargs='+',
+                        help="TFLite models, directories, glob patterns or manifest files")
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help="Directory to save the converted ONNX models (default: %(default)s)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="Time limit (in seconds) of converting each model")
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help="Memory limit (in MB) of each worker process")
+    parser.add_argument('--mmap', action='store_true',
+                        help="Memory-map the TFLite models instead of reading them into memory")
+    parser.add_argument('--validation', choices=VALIDATION_LEVELS, default='full',
+                        help="How much to validate during conversion (default: %(default)s)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Directory of the conversion cache, reusing models converted before")
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help="Size limit (in MB) of the conversion cache (default: %(default)s)")
+    parser.add_argument('--integer-ops', action='store_true',
+                        help="Lower quantized Conv and FullyConnected to native integer operators")
+
+    args = parser.parse_args()
+
+    models = collectModels(args.inputs, args.output_dir)
+    memory_limit = args.memory_limit * 1024 * 1024 if args.memory_limit else None
+    results = convertBatch(models, args.workers, args.timeout, memory_limit,
+                           use_mmap=args.mmap, validation=args.validation,
+                           cache_dir=args.cache_dir, cache_size=args.cache_size * 1024 * 1024,
+                           integer_ops=args.integer_ops)
+    print(formatSummary(results))
+    if not all(r.ok for r in results):
+        raise SystemExit(1)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import tflite2onnx
+
+logger = logging.getLogger('tflite2onnx')
+
+
+class ConversionCache:
+    """On-disk cache of converted ONNX models, addressed by the conversion inputs.
+
+    An entry is keyed by a digest of the TFLite model content, the explicit
+    layouts, the package version and the conversion options, such that a
+    cached ONNX model is exactly what the conversion would produce. Entries
+    are evicted in least recently used order once the total size exceeds
+    `max_size` bytes. The cache can be shared by processes, entries are
+    written atomically and lookups that race with eviction are misses.
+    """
+    def __init__(self, cache_dir: str, max_size=1 << 30):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(tflite_buffer, explicit_layouts, options):
+        meta = {
+            'version': tflite2onnx.__version__,
+            'explicit_layouts': sorted((k, list(v)) for k, v in explicit_layouts.items()),
+            'options': sorted(options.items()),
+        }
+        digest = hashlib.sha256(memoryview(tflite_buffer))
+        digest.update(json.dumps(meta).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.onnx')
+
+    def get(self, key, onnx_path):
+        """Copy the cached model of `key` to `onnx_path`, return whether it is a hit."""
+        path = self._path(key)
+        try:
+            # the modification time tracks the last use
+            os.utime(path)
+            shutil.copyfile(path, onnx_path)
+        except FileNotFoundError:
+            logger.debug("Conversion cache miss: %s", key)
+            return False
+        logger.info("Conversion cache hit: %s", key)
+        return True
+
+    def put(self, key, onnx_path):
+        """Add the converted model at `onnx_path` as `key`, evicting old ones if needed."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(onnx_path, tmp_path)
+            os.replace(tmp_path, self._path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        logger.debug("Conversion cache added: %s", key)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.onnx'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+
+        total = sum(e[1] for e in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            logger.debug("Conversion cache evicting: %s", name)
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -1,6 +1,25 @@
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
+# How much validation to perform when converting, cheapest first.
+# * `none`: no validation.
+# * `final-only`: check the resulted ONNX model only.
+# * `full`: validate the graph and every tensor in addition to `final-only`.
+VALIDATION_LEVELS = ('none', 'final-only', 'full')
+
+
+def parallelMap(func, items, num_threads=None):
+    """Return `[func(i) for i in items]`, computed on a thread pool if `num_threads` > 1.
+
+    The results are in the order of `items`, and the first exception raised
+    by `func` is raised again here.
+    """
+    if num_threads is None or num_threads <= 1:
+        return [func(i) for i in items]
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        return list(executor.map(func, items))
+
 
 class Status(Enum):
     # Before `__init__()` finishes.
@@ -36,7 +55,14 @@ class Status(Enum):
 
 
 class T2OBase(ABC):
-    """Holding objects of TFLite and ONNX"""
+    """Holding objects of TFLite and ONNX
+
+    The IR classes are slotted to be compact, as a graph can have a lot of
+    tensors and operators. Subclasses should define `__slots__` of their
+    own fields, otherwise a per-object `__dict__` is created again.
+    """
+    __slots__ = ('status', 'name', 'model', 'graph', 'index', 'tflite', 'onnx')
+
     def __init__(self, model=None, graph=None, index=None):
         # Overall fields
         self.status = Status.UNINITIALIZED
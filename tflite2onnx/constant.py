@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import numpy as np
+
+from tflite2onnx import mapping
+
+logger = logging.getLogger('tflite2onnx')
+
+
+def contentKey(ndarray):
+    """The key to identify a constant by its dtype, shape and content digest."""
+    digest = hashlib.sha256(np.ascontiguousarray(ndarray).tobytes()).hexdigest()
+    return (str(ndarray.dtype), tuple(ndarray.shape), digest)
+
+
+def deduplicateInitializers(tensors):
+    """Collapse identical initializers into one across the graph.
+
+    Initializers of the same dtype, shape and content are merged into the
+    first one of them in `tensors`, by which the consumers of the others are
+    taken over. The merged ones are dropped from the graph once they have no
+    operator linked. This must be called when the data of initializers has
+    been finalized, i.e. after layout transformation and dequantization.
+    """
+    logger.debug("Constant Dedup: Deduplicating initializers across graph...")
+
+    # only the ones of the same dtype and shape need to be digested
+    groups = dict()
+    for t in tensors:
+        if isinstance(t.data, np.ndarray) and len(t.consumers) > 0:
+            key = (t.dtype, str(t.data.dtype), tuple(t.data.shape))
+            groups.setdefault(key, []).append(t)
+
+    count = 0
+    saved = 0
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        kept = dict()
+        for t in group:
+            key = contentKey(t.data)
+            if key not in kept:
+                kept[key] = t
+                continue
+            keep = kept[key]
+            if any(op in keep.consumers for op in t.consumers):
+                # an operator doesn't take the same tensor twice
+                continue
+
+            logger.debug("Constant Dedup: Merging %s into %s", t.name, keep.name)
+            for op in list(t.consumers):
+                op.replaceInput(t, keep)
+                keep.addConsumer(op)
+                t.removeConsumer(op)
+            count += 1
+            saved += t.data.nbytes
+
+    if count > 0:
+        logger.info("Constant Dedup: %d initializers are merged, %d bytes saved!",
+                    count, saved)
+    return saved
+
+
+def _quantizeLinear(op, x, scale, zero_point):
+    # saturate to the output type, the zero point data can be a list of int64
+    dtype = mapping.DTYPE_ONNX2NAME[op.outputs[0].dtype]
+    info = np.iinfo(dtype)
+    quantized = np.rint(x / scale) + zero_point.astype('int32')
+    return np.clip(quantized, info.min, info.max).astype(dtype)
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+# operator type -> function computing the output from the operator and its input values
+FOLDERS = {
+    'Abs': lambda op, x: np.abs(x),
+    'Add': lambda op, a, b: a + b,
+    'Clip': lambda op, x, low, high: np.clip(x, low, high),
+    'Mul': lambda op, a, b: a * b,
+    'Pow': lambda op, a, b: np.power(a, b),
+    'QuantizeLinear': _quantizeLinear,
+    'Relu': lambda op, x: np.maximum(x, 0),
+    'Reshape': lambda op, x, shape: np.reshape(x, op.outputs[0].shape),
+    'Sigmoid': lambda op, x: _sigmoid(x),
+    'Sqrt': lambda op, x: np.sqrt(x),
+    'Sub': lambda op, a, b: a - b,
+    'Transpose': lambda op, x: np.transpose(x, op.attrs['perm']),
+}
+
+
+def _foldable(op, outputs):
+    if len(op.outputs) != 1 or any(op.outputs[0] is o for o in outputs):
+        return False
+    if not all(t.isInitializer and np.size(t.data) > 0 for t in op.inputs):
+        return False
+    return op.type in FOLDERS
+
+
+def foldConstants(ops, outputs):
+    """Evaluate the operators of which all inputs are initializers, at conversion time.
+
+    The output of such an operator becomes an initializer, and the operator
+    is dropped from the graph, as well as the inputs that have no other
+    consumers. `ops` must be in topological order, such that the operators
+    that become foldable by a fold are handled in the same pass. Graph
+    `outputs` are not folded.
+
+    `DequantizeLinear` is not folded, such that quantized weights are kept
+    in integer with their quantization parameters, from which runtimes can
+    build integer kernels. While the `QuantizeLinear` of float weights is.
+    This must be called after quantization has been translated.
+    """
+    logger.debug("Constant Folder: Folding constant operators across graph...")
+
+    count = 0
+    for op in ops:
+        if not _foldable(op, outputs):
+            continue
+        output = op.outputs[0]
+        values = [np.reshape(np.asarray(t.data), t.shape) for t in op.inputs]
+        data = FOLDERS[op.type](op, *values)
+        assert(tuple(data.shape) == tuple(output.shape))
+        logger.debug("Constant Folder: Folding %s", op.shorty)
+        output.data = np.ascontiguousarray(data, dtype=mapping.DTYPE_ONNX2NAME[output.dtype])
+
+        for t in op.inputs:
+            t.removeConsumer(op)
+        output.removeProducer(op)
+        count += 1
+
+    if count > 0:
+        logger.info("Constant Folder: %d operators are folded!", count)
+    return count
@@ -1,15 +1,55 @@
 import argparse
 import logging
+import mmap
 import os
 
 import tflite
 import tflite2onnx
+from tflite2onnx.cache import ConversionCache
+from tflite2onnx.common import VALIDATION_LEVELS
 from tflite2onnx.model import Model
+from tflite2onnx.profiler import NULL_PROFILER, Profiler
 
 logger = logging.getLogger('tflite2onnx')
 
 
-def convert(tflite_path: str, onnx_path: str, explicit_layouts=None):
+def _loadTFLite(tflite_path: str, use_mmap=False):
+    """Load the TFLite model file into a buffer that can be parsed by `tflite`.
+
+    With `use_mmap`, the file is memory-mapped read-only instead of being read
+    into memory. The weight buffers are then paged in on demand when they
+    are accessed, and the mapping is released when the parsed model is gone.
+    """
+    with open(tflite_path, 'rb') as f:
+        if use_mmap:
+            # The mapping holds its own file descriptor, closing `f` is fine.
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            return f.read()
+
+
+def _checkExplicitLayouts(explicit_layouts):
+    if explicit_layouts:
+        for k, v in explicit_layouts.items():
+            if not (isinstance(k, str) and isinstance(v, tuple) and
+                    (len(v) == 2) and isinstance(v[0], str) or isinstance(v[1], str)):
+                raise ValueError("Invalid explicit layouts!")
+        return explicit_layouts
+    else:
+        return dict()
+
+
+def _convertModel(buf, explicit_layouts, validation, num_threads, profiler, integer_ops):
+    im = tflite.Model.GetRootAsModel(buf, 0)
+    model = Model(im, profiler)
+    model.convert(explicit_layouts, validation, num_threads, integer_ops)
+    return model
+
+
+def convert(tflite_path: str, onnx_path: str, explicit_layouts=None, use_mmap=False,
+            external_data=False, size_threshold=1024, alignment=4096, max_file_size=None,
+            validation='full', num_threads=None, cache_dir=None, cache_size=1 << 30,
+            profiler=None, integer_ops=False):
     """Converting TensorFlow Lite model (*.tflite) to ONNX model.
 
     Args:
@@ -19,6 +59,34 @@ def convert(tflite_path: str, onnx_path: str, explicit_layouts=None):
             For each items, its *tensor name* `->` *tflite layout* and *onnx layout*.
             This can be safely ignored usually - tflite2onnx can handle most
             layout semantic divergence automatically.
+        use_mmap (bool, optional): memory-map the TFLite model rather than
+            reading it into memory, which reduces the peak memory of
+            converting large models.
+        external_data (bool, optional): save initializers into external data
+            files beside the ONNX model rather than inside it. This is required
+            for models larger than 2GB.
+        size_threshold (int, optional): initializers smaller than this (in bytes)
+            are kept in the ONNX model when saving external data.
+        alignment (int, optional): the alignment (in bytes) of each initializer
+            in the external data files, page size by default.
+        max_file_size (int, optional): the size limit (in bytes) of each external
+            data file, initializers are saved into one file if not set.
+        validation (str, optional): how much to validate during conversion, one of
+            `none`, `final-only` (check the resulted model only) and `full`
+            (check the graph and every tensor as well).
+        num_threads (int, optional): transpose and dequantize weights with this
+            many threads. Everything is done serially if not set.
+        cache_dir (str, optional): the directory of conversion cache. If set,
+            the ONNX model is copied from the cache if the same TFLite model
+            has been converted with the same options, and added otherwise.
+            Not used with `external_data`.
+        cache_size (int, optional): the size limit (in bytes) of the conversion
+            cache, the least recently used models are evicted beyond it.
+        profiler (Profiler, optional): record the time (and memory, if enabled) of
+            conversion phases and operator types into it.
+        integer_ops (bool, optional): lower quantized `Conv` and `FullyConnected` to
+            native integer operators such as `QLinearConv`, rather than keeping
+            them in float between `QuantizeLinear` and `DequantizeLinear`.
     """
 
     if not os.path.exists(tflite_path):
@@ -26,33 +94,110 @@ def convert(tflite_path: str, onnx_path: str, explicit_layouts=None):
     if os.path.exists(onnx_path):
         logger.warning("ONNX model path (%s) existed!", onnx_path)
 
-    if explicit_layouts:
-        for k, v in explicit_layouts.items():
-            if not (isinstance(k, str) and isinstance(v, tuple) and
-                    (len(v) == 2) and isinstance(v[0], str) or isinstance(v[1], str)):
-                raise ValueError("Invalid explicit layouts!")
-    else:
-        explicit_layouts = dict()
+    explicit_layouts = _checkExplicitLayouts(explicit_layouts)
 
     logger.debug("tflite: %s", tflite_path)
     logger.debug("onnx: %s", onnx_path)
-    with open(tflite_path, 'rb') as f:
-        buf = f.read()
-        im = tflite.Model.GetRootAsModel(buf, 0)
+    profiler = profiler or NULL_PROFILER
+    with profiler.phase('total'):
+        with profiler.phase('load'):
+            buf = _loadTFLite(tflite_path, use_mmap)
 
-    model = Model(im)
-    model.convert(explicit_layouts)
-    model.save(onnx_path)
+        cache = None
+        if cache_dir and external_data:
+            logger.warning("Conversion cache is not used with external data")
+        elif cache_dir:
+            cache = ConversionCache(cache_dir, cache_size)
+            with profiler.phase('cache lookup'):
+                key = cache.key(buf, explicit_layouts,
+                                {'validation': validation, 'integer_ops': integer_ops})
+                hit = cache.get(key, onnx_path)
+            if hit:
+                logger.info("Converted ONNX model (cached): %s", onnx_path)
+                return
+
+        model = _convertModel(buf, explicit_layouts, validation, num_threads, profiler,
+                              integer_ops)
+        model.save(onnx_path, external_data, size_threshold, alignment, max_file_size)
+        if cache is not None:
+            cache.put(key, onnx_path)
     logger.info("Converted ONNX model: %s", onnx_path)
 
 
+def convert_buffer(tflite_buffer, explicit_layouts=None, serialize=False, validation='full',
+                   num_threads=None, profiler=None, integer_ops=False):
+    """Converting TensorFlow Lite model in memory to ONNX model, without touching disk.
+
+    Args:
+        tflite_buffer (bytes, bytearray or memoryview): the content of TFLite model.
+        explicit_layouts (dict, optinal): same as `convert()`.
+        serialize (bool, optional): return the serialized ONNX model rather
+            than the `onnx.ModelProto` object.
+        validation (str, optional): same as `convert()`.
+        num_threads (int, optional): same as `convert()`.
+        profiler (Profiler, optional): same as `convert()`.
+        integer_ops (bool, optional): same as `convert()`.
+
+    Returns:
+        The converted `onnx.ModelProto`, or its serialized `bytes` if `serialize`.
+    """
+    explicit_layouts = _checkExplicitLayouts(explicit_layouts)
+
+    profiler = profiler or NULL_PROFILER
+    with profiler.phase('total'):
+        model = _convertModel(tflite_buffer, explicit_layouts, validation, num_threads,
+                              profiler, integer_ops)
+        model.check()
+    logger.info("Converted ONNX model in memory")
+
+    if serialize:
+        return model.onnx.SerializeToString()
+    return model.onnx
+
+
 def cmd_convert():
     description = "tflite2onnx " + tflite2onnx.__version__ + ", " + tflite2onnx.DESCRIPTION
     parser = argparse.ArgumentParser(description=description,
                                      formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument('tflite_path', help="Path to the input TFLite mode")
     parser.add_argument('onnx_path', help="Path to save the converted ONNX mode")
+    parser.add_argument('--mmap', action='store_true',
+                        help="Memory-map the TFLite model instead of reading it into memory")
+    parser.add_argument('--external-data', action='store_true',
+                        help="Save initializers into external data files beside the ONNX model")
+    parser.add_argument('--size-threshold', type=int, default=1024,
+                        help="Initializers smaller than this (in bytes) are kept in the model\n"
+                             "when saving external data (default: %(default)s)")
+    parser.add_argument('--alignment', type=int, default=4096,
+                        help="Alignment (in bytes) of initializers in the external data files\n"
+                             "(default: %(default)s)")
+    parser.add_argument('--max-file-size', type=int, default=None,
+                        help="Size limit (in bytes) of each external data file")
+    parser.add_argument('--validation', choices=VALIDATION_LEVELS, default='full',
+                        help="How much to validate during conversion (default: %(default)s)")
+    parser.add_argument('--num-threads', type=int, default=None,
+                        help="Transpose and dequantize weights with this many threads")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Directory of the conversion cache, reusing models converted before")
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help="Size limit (in MB) of the conversion cache (default: %(default)s)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print the time of conversion phases and operator types")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Print the peak memory of conversion phases and the biggest\n"
+                             "tensors in addition to --profile, which slows down conversion")
+    parser.add_argument('--integer-ops', action='store_true',
+                        help="Lower quantized Conv and FullyConnected to native integer operators")
 
     args = parser.parse_args()
 
-    convert(args.tflite_path, args.onnx_path)
+    profile = args.profile or args.profile_memory
+    profiler = Profiler(memory=args.profile_memory) if profile else None
+    convert(args.tflite_path, args.onnx_path, use_mmap=args.mmap,
+            external_data=args.external_data, size_threshold=args.size_threshold,
+            alignment=args.alignment, max_file_size=args.max_file_size,
+            validation=args.validation, num_threads=args.num_threads,
+            cache_dir=args.cache_dir, cache_size=args.cache_size * 1024 * 1024,
+            profiler=profiler, integer_ops=args.integer_ops)
+    if profiler is not None:
+        print(profiler.report())
@@ -1,59 +1,133 @@
-import copy
+import heapq
+import itertools
 import logging
 import tflite
 from onnx import helper
 
-from tflite2onnx.tensor import TensorFactory
-from tflite2onnx.common import T2OBase
+from tflite2onnx.tensor import Tensor, TensorFactory
+from tflite2onnx.common import T2OBase, parallelMap
+from tflite2onnx.constant import deduplicateInitializers, foldConstants
 from tflite2onnx.layout import Layout
+from tflite2onnx.lowering import lowerToInteger
 from tflite2onnx.op import OpFactory
+from tflite2onnx.profiler import NULL_PROFILER
 from tflite2onnx.quantize import handleQuantizationTensor
 from tflite2onnx.quantize import foldFP16QuantPattern
+from tflite2onnx.rewrite import Rewriter
+from tflite2onnx.transpose import TransposeOptimizer
 
 logger = logging.getLogger('tflite2onnx')
 
 
+class GraphIndex:
+    """Operators and tensors of a graph, maintained as they are linked.
+
+    Tensors report to the index whenever an operator is added to, removed from
+    or replaced in their producers and consumers. An operator or tensor is
+    part of the graph as long as it has any link, such that the graph can be
+    queried without walking it after every change.
+    """
+    def __init__(self):
+        # object -> count of links, dicts are ordered by insertion
+        self.op_links = dict()
+        self.tensor_links = dict()
+        # bumped when an operator is added or removed, to invalidate orders
+        self.op_version = 0
+
+    def link(self, tensor, op):
+        self.tensor_links[tensor] = self.tensor_links.get(tensor, 0) + 1
+        if op not in self.op_links:
+            self.op_links[op] = 0
+            self.op_version += 1
+        self.op_links[op] += 1
+
+    def unlink(self, tensor, op):
+        assert(tensor in self.tensor_links and op in self.op_links)
+        self.tensor_links[tensor] -= 1
+        if self.tensor_links[tensor] == 0:
+            del self.tensor_links[tensor]
+        self.op_links[op] -= 1
+        if self.op_links[op] == 0:
+            del self.op_links[op]
+            self.op_version += 1
+
+    @property
+    def ops(self):
+        return self.op_links.keys()
+
+    @property
+    def tensors(self):
+        return self.tensor_links.keys()
+
+
+def sortOperators(ops):
+    """Order operators topologically w.r.t. the producers and consumers of their tensors.
+
+    This is Kahn's algorithm, iterative such that no recursion limit applies.
+    When several operators are ready, the one comes first in `ops` is taken,
+    so the result is stable. Raise `ValueError` if the graph has a cycle.
+    """
+    ops = list(ops)
+    rank = {op: i for i, op in enumerate(ops)}
+
+    indegree = dict()
+    for op in ops:
+        producers = {p for t in op.inputs for p in t.producers}
+        indegree[op] = len(producers)
+
+    ready = [rank[op] for op in ops if indegree[op] == 0]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        op = ops[heapq.heappop(ready)]
+        ordered.append(op)
+        consumers = {c for t in op.outputs for c in t.consumers}
+        for c in consumers:
+            indegree[c] -= 1
+            if indegree[c] == 0:
+                heapq.heappush(ready, rank[c])
+
+    if len(ordered) != len(ops):
+        raise ValueError("The graph has cycle, %d operators cannot be ordered!" %
+                         (len(ops) - len(ordered)))
+    return ordered
+
+
 class Graph(T2OBase):
-    def __init__(self, model: tflite.Model, graph: tflite.SubGraph):
+    def __init__(self, model: tflite.Model, graph: tflite.SubGraph, profiler=NULL_PROFILER):
         super().__init__(model, graph)
 
         self.ops = []   # the OP that has TFLite peer
-        self.op_all = []  # includes helper OP
+        self._op_all = []  # includes helper OP, ordered
+        self._op_all_version = -1
 
         self.inputs = []
         self.outputs = []
-        self.initializer = set()
-        self.value_info = set()
 
         self.tflite = graph
-        self.TFactory = TensorFactory(model, graph)
+        self.graph_index = GraphIndex()
+        self.TFactory = TensorFactory(model, graph, self.graph_index)
         self.OPCFactory = OpFactory(self.TFactory)
+        self.profiler = profiler
 
         self.setInited()
 
-    def _collectOpAndTensor(self):
-        self.op_all.clear()
-
-        # collect operators
-        def _recursive(op):
-            for cur_op in op.pre:
-                _recursive(cur_op)
-            self.op_all.append(op)
-            for cur_op in op.post:
-                _recursive(cur_op)
-        for op in self.ops:
-            _recursive(op)
+    @property
+    def op_all(self):
+        """All operators in order, including helpers, re-ordered only if any has changed."""
+        if self._op_all_version != self.graph_index.op_version:
+            self._op_all = sortOperators(self.graph_index.ops)
+            self._op_all_version = self.graph_index.op_version
+        return self._op_all
+
+    # in the order that tensors joined the graph, to generate deterministic graph
+    @property
+    def initializer(self):
+        return [t for t in self.graph_index.tensors if t.isInitializer]
 
-        # collect tensors
-        assert(len(self.op_all) > 0)
-        self.initializer.clear()
-        self.value_info.clear()
-        for op in self.op_all:
-            for t in op.inputs + op.outputs:
-                if t.isInitializer:
-                    self.initializer.add(t)
-                else:
-                    self.value_info.add(t)
+    @property
+    def value_info(self):
+        return [t for t in self.graph_index.tensors if not t.isInitializer]
 
     def parse(self):
         logger.debug("Parsing the Graph...")
@@ -61,7 +135,8 @@ class Graph(T2OBase):
         for i in range(self.graph.OperatorsLength()):
             logger.debug("Parsing operator: %d", i)
             op = self.OPCFactory.create(i)
-            op.parse()
+            with self.profiler.operator(op.type, 'parse'):
+                op.parse()
             self.ops.append(op)
 
         # inputs
@@ -77,21 +152,80 @@ class Graph(T2OBase):
             t = self.TFactory.get(index)
             self.outputs.append(t)
 
-        self._collectOpAndTensor()
-
         self.setParsed()
 
     def validate(self):
-        self._collectOpAndTensor()
         for op in self.op_all:
             op.validate()
-        for t in self.initializer | self.value_info:
+        for t in self.graph_index.tensors:
             t.validate()
 
-    def convert(self, explicit_layouts):
+    def convert(self, explicit_layouts, validation='full', num_threads=None, integer_ops=False):
+        """Convert the graph, processing weights with `num_threads` threads if > 1.
+
+        Transposing and dequantizing the data of initializers is the heavy
+        part of converting weight-heavy models. They are batched into stages
+        that run on a thread pool, as numpy releases the GIL for them.
+        """
         logger.debug("Converting...")
+        profiler = self.profiler
 
         logger.debug("Handling data layout...")
+        with profiler.phase('apply explicit layouts'):
+            self._applyExplicitLayouts(explicit_layouts)
+        with profiler.phase('propagate layout'):
+            self._propagateLayout(num_threads)
+        with profiler.phase('optimize transposes'):
+            TransposeOptimizer(self).optimize()
+        with profiler.phase('rewrite'):
+            Rewriter(self).rewrite()
+
+        with profiler.phase('fold FP16 quantization'):
+            foldFP16QuantPattern(self.ops)
+
+        with profiler.phase('translate quantization'):
+            self._translateQuantization(num_threads)
+
+        with profiler.phase('fold constants'):
+            foldConstants(self.op_all, self.outputs)
+
+        if integer_ops:
+            with profiler.phase('lower to integer'):
+                lowerToInteger(self)
+
+        with profiler.phase('deduplicate initializers'):
+            deduplicateInitializers(self.initializer)
+
+        # the graph is printed only if debug logging is enabled
+        logger.debug("Graph:\n%s", self)
+
+        if validation == 'full':
+            with profiler.phase('validate'):
+                self.validate()
+        with profiler.phase('convert operators'):
+            for op in self.op_all:
+                with profiler.operator(op.type, 'convert'):
+                    op.convert()
+        if validation == 'full':
+            with profiler.phase('check tensors'):
+                for t in self.graph_index.tensors:
+                    t.check()
+
+        profiler.recordTensors(self.graph_index.tensors)
+
+        logger.debug("Making ONNX...")
+        with profiler.phase('make graph'):
+            onodes = [n.onnx for n in self.op_all]
+            oinputs = [t.onnx for t in self.inputs]
+            ooutputs = [t.onnx for t in self.outputs]
+            initializer = [t.onnx for t in self.initializer]
+            value_info = [t.onnx for t in self.value_info]
+
+            self.onnx = helper.make_graph(onodes, 'pre-alpha', oinputs, ooutputs,
+                                          initializer=initializer, value_info=value_info)
+        self.setConverted()
+
+    def _applyExplicitLayouts(self, explicit_layouts):
         for op in self.ops:
             for t in op.inputs + op.outputs:
                 if t.name in explicit_layouts:
@@ -99,45 +233,26 @@ class Graph(T2OBase):
                     layouts = explicit_layouts[t.name]
                     assert(len(layouts) == 2)
                     t.layout = Layout(layouts[0], layouts[1])
-        self._propagateLayout()
-        self._collectOpAndTensor()
-
-        foldFP16QuantPattern(self.ops)
-        self._collectOpAndTensor()
 
+    def _translateQuantization(self, num_threads=None):
         logger.debug("Translating quantization semantic...")
-        for t in self.value_info | self.initializer:
+        # in the order that tensors joined the graph, to generate deterministic graph
+        quantized = [t for t in self.graph_index.tensors if t.quantized]
+        parallelMap(Tensor.dequantize, quantized, num_threads)
+        for t in quantized:
             deqt = handleQuantizationTensor(self.TFactory, t)
             for i, o in enumerate(self.outputs):
                 if o == t:
                     self.outputs[i] = deqt
-        self._collectOpAndTensor()
-
-        logger.debug("Graph:\n%s", str(self))
-
-        self.validate()
-        for op in self.op_all:
-            op.convert()
-
-        logger.debug("Making ONNX...")
-        onodes = [n.onnx for n in self.op_all]
-        oinputs = [t.onnx for t in self.inputs]
-        ooutputs = [t.onnx for t in self.outputs]
-        initializer = [t.onnx for t in self.initializer]
-        value_info = [t.onnx for t in self.value_info]
-
-        self.onnx = helper.make_graph(onodes, 'pre-alpha', oinputs, ooutputs,
-                                      initializer=initializer, value_info=value_info)
-        self.setConverted()
 
-    def _propagateLayout(self):        # noqa: C901
+    def _propagateLayout(self, num_threads=None):        # noqa: C901
         logger.debug("Propragating layout across graph...")
 
         # collect tensors
         T_toWalk = set()
         T_wild = set()
-        tensor_count = len(self.value_info) + len(self.initializer)
-        for t in self.value_info | self.initializer:
+        tensor_count = len(self.graph_index.tensors)
+        for t in self.graph_index.tensors:
             if t.layout is None:
                 T_wild.add(t)
             else:
@@ -151,7 +266,7 @@ class Graph(T2OBase):
         while (len(T_toWalk) != 0):
             T = T_toWalk.pop()
             logger.debug("Propagation: walking %s", T.shorty)
-            for n in T.producers + T.consumers:
+            for n in itertools.chain(T.producers, T.consumers):
                 for t in n.propagatableTensors():
                     if t is T:
                         continue
@@ -162,16 +277,17 @@ class Graph(T2OBase):
                         if t.isScalar:
                             T_ignored.add(t)
                         else:
-                            t.layout = copy.deepcopy(T.layout)
+                            t.layout = T.layout
                             T_toWalk.add(t)
             T_walked.add(T)
         logger.debug("Propagation: wild tensors %d, ignored tensors %d",
                      len(T_wild), len(T_ignored))
 
         # update tensor and operator
-        for t in T_walked:
-            t.transform()
-        self._collectOpAndTensor()
+        # with threads, copy the transposed weights on the workers where numpy releases
+        # the GIL, otherwise they are kept as views which are copied once when serializing
+        contiguous = num_threads is not None and num_threads > 1
+        parallelMap(lambda t: t.transform(contiguous), T_walked, num_threads)
         for op in self.op_all:
             op.transform()
 
@@ -18,19 +18,50 @@ def transform(input, ilayout: str, olayout: str):
 
 
 class Layout(object):
-    def __init__(self, source: str, target: str):
-        self.source = source
-        self.target = target
-        self.current = source
+    """Layout semantic from TFLite (`source`) to ONNX (`target`), e.g. NHWC to NCHW.
+
+    Layouts are interned and immutable: `Layout(source, target)` returns the
+    same object for the same pair, of which the permutations are computed once.
+    Therefore, a layout can be shared by tensors and compared by identity.
+    Whether a tensor has been transformed is tracked by the tensor.
+    """
+    __slots__ = ('source', 'target', 'perm', 'inversePerm')
+    _interned = dict()
+
+    def __new__(cls, source: str, target: str):
+        key = (source, target)
+        layout = cls._interned.get(key)
+        if layout is None:
+            layout = super().__new__(cls)
+            object.__setattr__(layout, 'source', source)
+            object.__setattr__(layout, 'target', target)
+            object.__setattr__(layout, 'perm', tuple(getPerm(source, target)))
+            object.__setattr__(layout, 'inversePerm', tuple(getPerm(target, source)))
+            # the first one wins if several threads are creating the same layout
+            layout = cls._interned.setdefault(key, layout)
+        return layout
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Layout is immutable")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (Layout, (self.source, self.target))
 
     def transform(self, input):
-        output = transform(input, self.source, self.target)
-        self.current = self.target
-        return output
+        if self.source == self.target:
+            return input
+        return [input[p] for p in self.perm]
 
     @property
-    def perm(self):
-        return getPerm(self.source, self.target)
+    def inverse(self):
+        """The layout that transforms from `target` back to `source`."""
+        return Layout(self.target, self.source)
 
     def __str__(self):
-        return self.current + '(' + self.source + '->' + self.target + ')'
+        return self.source + '->' + self.target
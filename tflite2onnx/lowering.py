@@ -0,0 +1,157 @@
+import copy
+import logging
+
+import numpy as np
+from onnx import TensorProto
+
+from tflite2onnx.op.binary import AddWrapper
+from tflite2onnx.op.conv import QLinearConvWrapper
+from tflite2onnx.op.fullyconnected import MatMulIntegerWrapper
+from tflite2onnx.op.quantize import Quantize
+from tflite2onnx.rewrite import Constant, Pattern, Rewriter, Rule, Value
+
+logger = logging.getLogger('tflite2onnx')
+
+
+def _dequantized(x, name):
+    return Pattern('DequantizeLinear', x, Constant(name + '_scale'), Constant(name + '_zero_point'),
+                   name=name + '_deq')
+
+
+def _scalar(t):
+    return float(np.asarray(t.data).flatten()[0])
+
+
+def _uniqueInputs(TFactory, op):
+    """Copy the inputs taken more than once, e.g. zero points of the same value.
+
+    An operator links to a tensor once, such that the copies are needed.
+    """
+    for i, t in enumerate(op.inputs):
+        if any(t is prev for prev in op.inputs[:i]):
+            name = 'TFLITE2ONNX_%s_%d' % (t.name, i)
+            copied = TFactory.getWithRef(t, name)
+            if not copied.isInitializer:
+                copied.data = copy.deepcopy(t.data)
+                copied.setParsed()
+            op.inputs[i] = copied
+
+
+class IntegerRule(Rule):
+    """Lower a float operator between the quantization pattern to integer ones.
+
+    The quantization semantic is translated as `DequantizeLinear -> [OP] ->
+    QuantizeLinear` where the weights are UINT8 initializers, and the
+    operator matches as `op` with `x` and `w` from the pattern. The output
+    of `op` is quantized by its only consumer, which is captured as `quant`.
+    The bias is requantized to INT32 in the scale of `x_scale * w_scale`.
+    """
+    def check(self, rewriter, captures):
+        y = captures['op'].outputs[0]
+        if len(y.consumers) != 1 or rewriter.isOutput(y):
+            return False
+        quant = next(iter(y.consumers))
+        if quant.type != 'QuantizeLinear' or not all(t.isInitializer for t in quant.inputs[1:]):
+            return False
+        captures['quant'] = quant
+        return (captures['x'].dtype == TensorProto.UINT8 and
+                captures['w'].dtype == TensorProto.UINT8)
+
+    def biasScale(self, captures):
+        return _scalar(captures['x_scale']) * _scalar(captures['w_scale'])
+
+    def integerBias(self, rewriter, captures):
+        bias = np.round(np.asarray(captures['bias'].data) / self.biasScale(captures))
+        return rewriter.TFactory.createVector(bias.astype('int32'))
+
+    def removeDequantize(self, rewriter, captures):
+        for name in ('x_deq', 'w_deq'):
+            rewriter.removeIfDead(captures[name])
+
+
+class LowerConv(IntegerRule):
+    """`Conv` (including depthwise) -> `QLinearConv`."""
+    pattern = Pattern('Conv', _dequantized(Value('x'), 'x'), _dequantized(Constant('w'), 'w'),
+                      Constant('bias'), name='op')
+
+    def apply(self, rewriter, captures):
+        conv = captures['op']
+        quant = captures['quant']
+        qconv = QLinearConvWrapper(rewriter.TFactory, -1)
+        qconv.attrs.update(conv.attrs)
+        for name in ('x', 'x_scale', 'x_zero_point', 'w', 'w_scale', 'w_zero_point'):
+            qconv.inputs.append(captures[name])
+        qconv.inputs.extend(quant.inputs[1:])
+        qconv.inputs.append(self.integerBias(rewriter, captures))
+        qconv.outputs.append(quant.outputs[0])
+        _uniqueInputs(rewriter.TFactory, qconv)
+        rewriter.remove(quant)
+        rewriter.replace(conv, qconv)
+        self.removeDequantize(rewriter, captures)
+
+
+class LowerFullyConnected(IntegerRule):
+    """`Gemm` -> `MatMulInteger`, `Add` of the bias, and `DequantizeLinear`.
+
+    `QLinearMatMul` takes no bias, which would be added after requantizing
+    then. Instead, the bias is added to the INT32 accumulator, which is
+    dequantized back to the float output that is quantized as before.
+    """
+    pattern = Pattern('Gemm', _dequantized(Value('x'), 'x'), _dequantized(Constant('w'), 'w'),
+                      Constant('bias'), name='op')
+
+    def check(self, rewriter, captures):
+        attrs = captures['op'].attrs
+        return (attrs['transA'] == 0 and attrs['transB'] == 1 and
+                attrs['alpha'] == 1.0 and attrs['beta'] == 1.0 and
+                len(captures['w'].shape) == 2 and super().check(rewriter, captures))
+
+    def apply(self, rewriter, captures):
+        TFactory = rewriter.TFactory
+        gemm = captures['op']
+        y = gemm.outputs[0]
+        w = captures['w']
+        # TFLite Fully Connected weight is (N, K)
+        wt = TFactory.createVector(np.ascontiguousarray(np.reshape(w.data, w.shape).T))
+
+        acc = TFactory.getWithRef(y, 'TFLITE2ONNX_Integer_%s' % y.name, True)
+        acc.dtype = TensorProto.INT32
+        acc.setParsed()
+        matmul = MatMulIntegerWrapper(TFactory, -1)
+        matmul.name = 'TFLITE2ONNX_MatMulInteger_%s' % y.name
+        matmul.inputs.extend([captures['x'], wt, captures['x_zero_point'],
+                              captures['w_zero_point']])
+        matmul.outputs.append(acc)
+        _uniqueInputs(TFactory, matmul)
+
+        biased = TFactory.getWithRef(acc, 'TFLITE2ONNX_Biased_%s' % y.name, True)
+        biased.setParsed()
+        add = AddWrapper(TFactory, -1)
+        add.name = 'TFLITE2ONNX_Add_%s' % y.name
+        add.inputs.extend([acc, self.integerBias(rewriter, captures)])
+        add.outputs.append(biased)
+
+        deq = Quantize(TFactory, -1)
+        deq.name = gemm.name
+        deq.inputs.extend([biased, TFactory.createScalar('float32', self.biasScale(captures)),
+                           TFactory.createScalar('int32', 0)])
+        deq.outputs.append(y)
+
+        rewriter.replace(gemm, deq)
+        rewriter.insert(add)
+        rewriter.insert(matmul)
+        self.removeDequantize(rewriter, captures)
+
+
+INTEGER_RULES = [LowerConv(), LowerFullyConnected()]
+
+
+def lowerToInteger(graph):
+    """Lower the quantized operators of `graph` to native integer operators.
+
+    This must be called after the quantization semantic has been translated
+    and the quantizing of weights has been folded, such that the weights are
+    UINT8 initializers dequantized by `DequantizeLinear`.
+    """
+    logger.debug("Integer Lowering: Lowering quantized operators to integer ones...")
+    return Rewriter(graph, INTEGER_RULES).rewrite()
@@ -1,20 +1,25 @@
 import logging
+import os
 import tflite
 import onnx
 from onnx import helper
+from onnx.external_data_helper import set_external_data
 
-from tflite2onnx.common import T2OBase
+from tflite2onnx.common import T2OBase, VALIDATION_LEVELS
 from tflite2onnx.graph import Graph
+from tflite2onnx.profiler import NULL_PROFILER
 
 logger = logging.getLogger('tflite2onnx')
 
 
 class Model(T2OBase):
     """Everything helps to convert TFLite model to ONNX model"""
-    def __init__(self, model: tflite.Model):
+    def __init__(self, model: tflite.Model, profiler=NULL_PROFILER):
         super().__init__(model)
         self.tflite = model
         self.graphes = []
+        self.validation = 'full'
+        self.profiler = profiler
         self.setInited()
 
     def parse(self):
@@ -24,7 +29,7 @@ class Model(T2OBase):
             raise NotImplementedError("ONNX supports one graph per model only, while TFLite has ",
                                       graph_count)
         tflg = self.model.Subgraphs(0)
-        graph = Graph(self.model, tflg)
+        graph = Graph(self.model, tflg, self.profiler)
         self.graphes.append(graph)
 
         for g in self.graphes:
@@ -35,11 +40,17 @@ class Model(T2OBase):
     def validate(self):
         pass
 
-    def convert(self, explicit_layouts):
-        self.parse()
+    def convert(self, explicit_layouts, validation='full', num_threads=None, integer_ops=False):
+        if validation not in VALIDATION_LEVELS:
+            raise ValueError("Invalid validation level %s, should be one of %s!" %
+                             (validation, VALIDATION_LEVELS))
+        self.validation = validation
+
+        with self.profiler.phase('parse'):
+            self.parse()
         logger.debug("Converting...")
         for g in self.graphes:
-            g.convert(explicit_layouts)
+            g.convert(explicit_layouts, validation, num_threads, integer_ops)
 
         # ONNXRuntime restrictions
         opset = helper.make_operatorsetid(onnx.defs.ONNX_DOMAIN, 11)
@@ -49,14 +60,39 @@ class Model(T2OBase):
                 'opset_imports': [opset],
                 }
 
-        self.onnx = helper.make_model(self.graphes[0].onnx, **attrs)
+        with self.profiler.phase('make model'):
+            self.onnx = helper.make_model(self.graphes[0].onnx, **attrs)
         self.setConverted()
 
-    def save(self, path: str):
+    def check(self):
+        """Check the converted ONNX model in memory, unless validation is disabled."""
+        assert(self.status.converted)
+        if self.validation != 'none':
+            with self.profiler.phase('check model'):
+                onnx.checker.check_model(self.onnx)
+
+    def save(self, path: str, external_data=False, size_threshold=1024, alignment=4096,
+             max_file_size=None):
+        """Save the ONNX model to `path`.
+
+        With `external_data`, initializers of at least `size_threshold` bytes
+        are streamed into sidecar files next to the model with ONNX external
+        data, each starting at an offset aligned to `alignment` bytes such that
+        runtimes can mmap them. A new file is started once `max_file_size`
+        bytes would be exceeded. This is how models larger than the 2GB
+        protobuf limit can be saved.
+        Note that `self.onnx` refers to the sidecar files afterward.
+        """
         logger.debug("saving model as %s", path)
         assert(self.status.converted)
-        onnx.save(self.onnx, path)
-        onnx.checker.check_model(path)
+        with self.profiler.phase('save'):
+            if external_data:
+                saveExternalData(self.onnx.graph, path, size_threshold, alignment,
+                                 max_file_size)
+            onnx.save(self.onnx, path)
+        if self.validation != 'none':
+            with self.profiler.phase('check model'):
+                onnx.checker.check_model(path)
 
     @property
     def shorty(self):
@@ -64,3 +100,55 @@ class Model(T2OBase):
 
     def __str__(self):
         return self.shorty
+
+
+def saveExternalData(graph, path: str, size_threshold: int, alignment: int, max_file_size=None):
+    """Move initializers of `graph` into page-aligned external data files.
+
+    The files are put in the directory of the model `path`, named as
+    `<model file name>.data`, or `<model file name>.<N>.data` if splitting
+    by `max_file_size`. Tensors that have no `raw_data` are kept inline.
+    """
+    assert(alignment > 0)
+    model_dir = os.path.dirname(os.path.abspath(path))
+    model_name = os.path.basename(path)
+
+    f = None
+    file_count = 0
+    offset = 0
+    saved = 0
+    try:
+        for t in graph.initializer:
+            if not t.HasField('raw_data'):
+                continue
+            data = t.raw_data
+            length = len(data)
+            if length < size_threshold:
+                continue
+
+            offset = (offset + alignment - 1) // alignment * alignment
+            exceeded = max_file_size and (offset > 0) and (offset + length > max_file_size)
+            if f is None or exceeded:
+                if f is not None:
+                    f.close()
+                if max_file_size:
+                    location = '%s.%d.data' % (model_name, file_count)
+                else:
+                    location = '%s.data' % model_name
+                logger.debug("Saving external data to %s", location)
+                f = open(os.path.join(model_dir, location), 'wb')
+                file_count += 1
+                offset = 0
+
+            # seeking beyond the end leaves zero padding before the tensor
+            f.seek(offset)
+            f.write(data)
+            set_external_data(t, location, offset, length)
+            t.ClearField('raw_data')
+            offset += length
+            saved += 1
+    finally:
+        if f is not None:
+            f.close()
+
+    logger.info("Saved %d initializers to %d external data files", saved, file_count)
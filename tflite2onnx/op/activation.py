@@ -13,6 +13,7 @@ class Activation(Operator):
         tflite.BuiltinOperator.RELU6: 'Clip',
         tflite.BuiltinOperator.RELU: 'Relu',
     }
+    __slots__ = ('preset_opcode',)
 
     def __init__(self, TFactory, index, preset_opcode=None):
         super().__init__(TFactory, index)
@@ -66,7 +67,7 @@ class Activation(Operator):
             # which will cause `out of index` exception during axis transform
             # so we expand its dimension by insert 1 to its shape
             alpha = self.parseInput(1)
-            alpha.shape.insert(0, 1)
+            alpha.shape = (1,) + alpha.shape
 
         self.parseOutput(0)
 
@@ -143,9 +144,5 @@ def handleFusedActivation(master, option, output, intermediate=None):
         act.outputs.append(output)
 
         act.setParsed()
-
-        # this is where we need *master* node, all tflite2onnx generated
-        # node shall be added as `pre` or `post` of the node that has a TFLite op.
-        master.post.append(act)
     else:
         raise NotImplementedError("Unsupported fused ActivationFunctionType")
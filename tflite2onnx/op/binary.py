@@ -1,4 +1,3 @@
-import copy
 import logging
 import tflite
 import numpy as np
@@ -18,6 +17,7 @@ class Binary(Operator):
         tflite.BuiltinOperator.SUB: 'Sub',
         tflite.BuiltinOperator.POW: 'Pow',
     }
+    __slots__ = ()
 
     OptionMapping = {
         tflite.BuiltinOperator.ADD: tflite.AddOptions,
@@ -57,7 +57,7 @@ class Binary(Operator):
 
         new_t_name = 'TFLITE2ONNX_Reshape_%s' % todo.name
         new_t = self.TFactory.getWithRef(todo, new_t_name, True)
-        new_t.shape = new_shape
+        new_t.shape = tuple(new_shape)
         new_t.setParsed()
 
         shape_t_name = 'TFLITE2ONNX_NewShape_%s' % todo.name
@@ -82,8 +82,6 @@ class Binary(Operator):
         new_t.addConsumer(self)
         reshape.setParsed()
 
-        self.pre.append(reshape)
-
     def parse(self):
         logger.debug("Parsing %s...", self.type)
 
@@ -129,7 +127,7 @@ def alignDimension(a, b):
     ref = b if align_a else a
 
     size = len(ref) - len(to_align)
-    aligned = copy.deepcopy(to_align)
+    aligned = list(to_align)
     for i in range(size):
         aligned.insert(0, 1)
 
@@ -138,6 +136,17 @@ def alignDimension(a, b):
 
 # wrapper is used here to override Binary.type property
 class PowerWrapper(Binary):
+    __slots__ = ()
+
     @property
     def type(self):
         return 'Pow'
+
+
+# wrapper is used here to override Binary.type property
+class AddWrapper(Binary):
+    __slots__ = ()
+
+    @property
+    def type(self):
+        return 'Add'
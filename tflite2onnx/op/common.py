@@ -9,6 +9,7 @@ logger = logging.getLogger('tflite2onnx')
 
 class Operator(T2OBase):
     TypeMapping = dict()
+    __slots__ = ('TFactory', 'inputs', 'outputs', 'attrs')
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory.model, TFactory.graph, index)
@@ -16,8 +17,6 @@ class Operator(T2OBase):
         self.tflite = self.graph.Operators(index) if index >= 0 else None
         self.inputs = []
         self.outputs = []
-        self.pre = []  # ops that before this op which to enable TFLite op
-        self.post = []  # ops that after this op which to enable TFLite op
         self.attrs = dict()  # One dict to hold all ONNX operator attributes
 
     @property
@@ -80,20 +79,20 @@ class Operator(T2OBase):
         return ot
 
     def replaceInput(self, original, new):
-        logger.debug("Replacing %s input %s with %s", self.shorty, original.shorty, new.shorty)
-        assert(original in self.inputs)
+        logger.debug("Replacing %s input %s with %s", self.name, original.name, new.name)
         for i, item in enumerate(self.inputs):
             if item is original:
                 self.inputs[i] = new
                 return
+        assert(False), "%s is not input of %s" % (original.shorty, self.shorty)
 
     def replaceOutput(self, original, new):
-        logger.debug("Replacing %s output %s with %s", self.shorty, original.shorty, new.shorty)
-        assert(original in self.outputs)
+        logger.debug("Replacing %s output %s with %s", self.name, original.name, new.name)
         for i, item in enumerate(self.outputs):
             if item is original:
                 self.outputs[i] = new
                 return
+        assert(False), "%s is not output of %s" % (original.shorty, self.shorty)
 
     def setParsed(self):
         """Name the operator (if not yet) and change to initialized.
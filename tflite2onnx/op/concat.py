@@ -11,6 +11,7 @@ class Concat(Operator):
     TypeMapping = {
         tflite.BuiltinOperator.CONCATENATION: 'Concat',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -55,4 +56,4 @@ class Concat(Operator):
         if layout is not None:
             axis = self.attrs['axis']
             axis = axis if axis >= 0 else (axis + len(layout.perm))
-            self.attrs['axis'] = layout.perm.index(axis)
+            self.attrs['axis'] = layout.inversePerm[axis]
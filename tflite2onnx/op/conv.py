@@ -14,6 +14,7 @@ class Conv(Operator):
         tflite.BuiltinOperator.CONV_2D: 'Conv',
         tflite.BuiltinOperator.DEPTHWISE_CONV_2D: 'Conv',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -73,7 +74,7 @@ class Conv(Operator):
 
         self.attrs['dilations'] = [option.DilationHFactor(), option.DilationWFactor()]
         self.attrs['group'] = wt.shape[3] if self.isDepthwise else 1
-        self.attrs['kernel_shape'] = wt.shape[1:3]
+        self.attrs['kernel_shape'] = list(wt.shape[1:3])
         self.attrs['strides'] = [option.StrideH(), option.StrideW()]
         # XXX Not enabled as ONNXRuntime has limitation to infer pads for non-1 dilation
         # self.attrs['auto_pad'] = PaddingMapping[option.Padding()]
@@ -98,6 +99,7 @@ class TransposeConv(Operator):
     TypeMapping = {
         tflite.BuiltinOperator.TRANSPOSE_CONV: 'ConvTranspose',
     }
+    __slots__ = ()
 
     # FIXME: cases that untested yet (we are not fully understand the semantic gap)
     # 1. Special output shape for VALID padding
@@ -155,7 +157,7 @@ class TransposeConv(Operator):
         option = tflite.TransposeConvOptions()
         option.Init(op_opt.Bytes, op_opt.Pos)
 
-        self.attrs['kernel_shape'] = wt.shape[1:3]
+        self.attrs['kernel_shape'] = list(wt.shape[1:3])
         self.attrs['strides'] = [option.StrideH(), option.StrideW()]
         oslayout = Layout('NHWC', 'NCHW')
         self.attrs['output_shape'] = oslayout.transform(oshape)
@@ -166,3 +168,12 @@ class TransposeConv(Operator):
 
     def transform(self):
         pass
+
+
+# wrapper is used here to override Conv.type property, for integer lowering
+class QLinearConvWrapper(Conv):
+    __slots__ = ()
+
+    @property
+    def type(self):
+        return 'QLinearConv'
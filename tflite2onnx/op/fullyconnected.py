@@ -11,6 +11,7 @@ class FullyConnected(Operator):
     TypeMapping = {
         tflite.BuiltinOperator.FULLY_CONNECTED: 'Gemm',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -66,3 +67,17 @@ class FullyConnected(Operator):
 
     def transform(self):
         pass
+
+
+# wrapper is used here to override FullyConnected.type property, for integer lowering
+class MatMulIntegerWrapper(FullyConnected):
+    __slots__ = ()
+
+    def __init__(self, TFactory, index):
+        super().__init__(TFactory, index)
+        # `MatMulInteger` has no attribute of `Gemm`
+        self.attrs.clear()
+
+    @property
+    def type(self):
+        return 'MatMulInteger'
@@ -17,6 +17,7 @@ class Padding(Operator):
         tflite.BuiltinOperator.PAD: 'Pad',
         tflite.BuiltinOperator.MIRROR_PAD: 'Pad',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -82,7 +83,7 @@ class Padding(Operator):
             pads_end = layout.transform(pads_end)
             pads = np.array([pads_begin, pads_end])
         pt.data = pads.flatten()
-        pt.shape = [np.prod(pt.shape), ]
+        pt.shape = (int(np.prod(pt.shape)),)
 
 
 # https://github.com/tensorflow/tensorflow/blob/v2.2.0/tensorflow/lite/kernels/padding.h#L58
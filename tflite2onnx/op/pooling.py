@@ -4,7 +4,7 @@ import tflite
 from tflite2onnx.layout import Layout
 from tflite2onnx.op.activation import handleFusedActivation
 from tflite2onnx.op.common import Operator
-from tflite2onnx.op.padding import PaddingMapping
+from tflite2onnx.op.padding import computePaddingSize
 
 logger = logging.getLogger('tflite2onnx')
 
@@ -14,13 +14,16 @@ class Pooling(Operator):
         tflite.BuiltinOperator.AVERAGE_POOL_2D: 'AveragePool',
         tflite.BuiltinOperator.MAX_POOL_2D: 'MaxPool',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
 
         self.attrs['kernel_shape'] = []
         self.attrs['strides'] = []
-        self.attrs['auto_pad'] = 'SAME_UPPER'  # See ComputePaddingHeightWidth() of TFLite
+        # Explicit pads rather than `auto_pad`, such that a `Pad` ahead can be folded.
+        # See ComputePaddingHeightWidth() of TFLite.
+        self.attrs['pads'] = [0, 0, 0, 0]
         # ceil_mod = 0
 
         self.setInited()
@@ -45,14 +48,16 @@ class Pooling(Operator):
         assert(op.OutputsLength() == 1)
 
         ilayout = Layout('NHWC', 'NCHW')
-        self.parseInput(0, ilayout)
+        it = self.parseInput(0, ilayout)
 
         op_opt = op.BuiltinOptions()
         option = tflite.Pool2DOptions()
         option.Init(op_opt.Bytes, op_opt.Pos)
-        self.attrs['auto_pad'] = PaddingMapping[option.Padding()]
         self.attrs['kernel_shape'] = [option.FilterHeight(), option.FilterWidth()]
         self.attrs['strides'] = [option.StrideH(), option.StrideW()]
+        self.attrs['pads'] = computePaddingSize(option.Padding(), it.shape[1:3],
+                                                self.attrs['kernel_shape'],
+                                                self.attrs['strides'], [1, 1])
 
         olayout = Layout('NHWC', 'NCHW')
         ot = self.parseOutput(0, olayout)
@@ -12,6 +12,7 @@ class Quantize(Operator):
         tflite.BuiltinOperator.QUANTIZE: 'QuantizeLinear',
         tflite.BuiltinOperator.DEQUANTIZE: 'DequantizeLinear',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
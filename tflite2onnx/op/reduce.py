@@ -11,6 +11,7 @@ class Reduce(Operator):
     TypeMapping = {
         tflite.BuiltinOperator.MEAN: 'ReduceMean',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -59,4 +60,4 @@ class Reduce(Operator):
         else:
             axes = self.attrs['axes']
             axes = [axe if axe >= 0 else (axes + len(layout.perm)) for axe in axes]
-            self.attrs['axes'] = [layout.perm.index(axe) for axe in axes]
+            self.attrs['axes'] = [layout.inversePerm[axe] for axe in axes]
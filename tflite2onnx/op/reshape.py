@@ -1,10 +1,8 @@
-import copy
 import logging
 import tflite
 import numpy as np
 
 from tflite2onnx import mapping
-from tflite2onnx.layout import Layout
 from tflite2onnx.op.common import Operator
 from tflite2onnx.op.transpose import Transpose
 
@@ -15,6 +13,7 @@ class Reshape(Operator):
     TypeMapping = {
         tflite.BuiltinOperator.RESHAPE: 'Reshape',
     }
+    __slots__ = ('forFakeBroadcasting',)
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -97,8 +96,8 @@ class Reshape(Operator):
         transposed = self.TFactory.getWithRef(to_transpose, transposed_name, True)
 
         # Construct the layout from the original input of `Reshape`
-        layout = Layout(to_transpose.layout.target, to_transpose.layout.source)
-        transposed.shape = layout.transform(to_transpose.shape)
+        layout = to_transpose.layout.inverse
+        transposed.shape = tuple(layout.transform(to_transpose.shape))
         transposed.setParsed()
 
         # Construct the additional transpose before `Reshape`
@@ -114,8 +113,6 @@ class Reshape(Operator):
         transposed.addConsumer(self)
         trans.setParsed()
 
-        self.pre.append(trans)
-
     def preserveOutputSpatialSemantic(self):
         # https://github.com/zhenhuaw-me/tflite2onnx/issues/28
         # An example for inserting `Transpose` after `Reshape`
@@ -142,8 +139,8 @@ class Reshape(Operator):
         to_transpose = self.TFactory.getWithRef(transposed, to_transpose_name, True)
 
         # Construct a layout from the original output of `Reshape`
-        layout = Layout(transposed.layout.target, transposed.layout.source)
-        to_transpose.shape = layout.transform(transposed.shape)
+        layout = transposed.layout.inverse
+        to_transpose.shape = tuple(layout.transform(transposed.shape))
         to_transpose.setParsed()
 
         # Construct the additional transpose after `Reshape`
@@ -161,8 +158,6 @@ class Reshape(Operator):
         # Rename the new `Transpose` operator avoid the name conflict with 'Reshape'
         trans.name = 'TFLITE2ONNX_Transpose_%s' % transposed.name
 
-        self.post.append(trans)
-
     def propagatableTensors(self):
         return list()
 
@@ -173,7 +168,7 @@ class Reshape(Operator):
         if self.forFakeBroadcasting:
             assert(len(i.shape) != len(o.shape))
             shape_t = self.inputs[1]
-            layout = copy.deepcopy(o.layout)
+            layout = o.layout
             if layout is None:
                 raise ValueError("Requires layout description for <%s>" % i.name)
             shape_t.data = np.array(layout.transform(shape_t.data))
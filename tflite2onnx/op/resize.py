@@ -14,6 +14,7 @@ class Resize(Operator):
         tflite.BuiltinOperator.RESIZE_NEAREST_NEIGHBOR: 'Resize',
         tflite.BuiltinOperator.RESIZE_BILINEAR: 'Resize',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -73,7 +74,7 @@ class Resize(Operator):
         # TFLite sizes is (H_new, W_new) while ONNX needs (N, C, H_new,W_new)
         assert len(sz.data) == 2
         assert len(im.shape) == 4
-        sz.shape = [len(im.shape)]
+        sz.shape = (len(im.shape),)
         sz.data = np.concatenate((np.array([im.shape[0], im.shape[-1]]), sz.data))
         sz.dtype = mapping.DTYPE_NAME2ONNX['int64']
 
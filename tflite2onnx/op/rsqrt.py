@@ -14,6 +14,7 @@ class Rsqrt(Operator):
     TypeMapping = {
         tflite.BuiltinOperator.RSQRT: 'Sqrt',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -72,7 +73,7 @@ class Rsqrt(Operator):
         invert.inputs.append(invert_t)
         invert.inputs.append(pow_t)
         invert.outputs.append(self.outputs[0])
+        self.outputs[0].replaceProducer(self, invert)
         self.replaceOutput(self.outputs[0], invert_t)
 
         invert.setParsed()
-        self.post.append(invert)
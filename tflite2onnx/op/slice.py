@@ -1,4 +1,3 @@
-import copy
 import logging
 import tflite
 import numpy as np
@@ -12,6 +11,7 @@ class Slice(Operator):
     TypeMapping = {
         tflite.BuiltinOperator.STRIDED_SLICE: 'Slice',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -62,6 +62,7 @@ class Slice(Operator):
         bt = self.parseInput(1)
         assert(bt.isInitializer)
         assert(rank == bt.shape[0])
+        bt.data = bt.data.copy()  # updated in place, while parsed data is read-only
         for i, (mask, begin) in enumerate(zip(m_begin, list(bt.data))):
             bt.data[i] = 0 if mask == 1 else begin
 
@@ -69,6 +70,7 @@ class Slice(Operator):
         et = self.parseInput(2)
         assert(et.isInitializer)
         assert(rank == et.shape[0])
+        et.data = et.data.copy()  # updated in place, while parsed data is read-only
         for i, (extent, mask, end) in enumerate(zip(it.shape, m_end, list(et.data))):
             et.data[i] = extent if mask == 1 else end
 
@@ -90,8 +92,7 @@ class Slice(Operator):
 
     def transform(self):
         logger.debug("Transforming %s...", self.shorty)
-        layout = self.outputs[0].layout
-        cl = copy.deepcopy(layout)
+        cl = self.outputs[0].layout
         if cl is None:
             logger.warning("layout of %s should not be None", self.shorty)
             return
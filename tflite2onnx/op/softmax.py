@@ -10,6 +10,7 @@ class Softmax(Operator):
     TypeMapping = {
             tflite.BuiltinOperator.SOFTMAX: 'Softmax',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
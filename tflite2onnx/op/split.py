@@ -12,6 +12,7 @@ class Split(Operator):
     TypeMapping = {
         tflite.BuiltinOperator.SPLIT: 'Split',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -71,4 +72,4 @@ class Split(Operator):
         if layout is not None:
             axis = self.attrs['axis']
             axis = axis if axis >= 0 else (axis + len(layout.perm))
-            self.attrs['axis'] = layout.perm.index(axis)
+            self.attrs['axis'] = layout.inversePerm[axis]
@@ -14,6 +14,7 @@ class SquaredDifference(Operator):
     TypeMapping = {
         tflite.BuiltinOperator.SQUARED_DIFFERENCE: 'Sub',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -75,7 +76,7 @@ class SquaredDifference(Operator):
         square.inputs.append(square_t)
         square.inputs.append(pow_t)
         square.outputs.append(self.outputs[0])
+        self.outputs[0].replaceProducer(self, square)
         self.replaceOutput(self.outputs[0], square_t)
 
         square.setParsed()
-        self.post.append(square)
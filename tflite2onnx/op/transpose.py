@@ -11,6 +11,7 @@ class Transpose(Operator):
     TypeMapping = {
         tflite.BuiltinOperator.TRANSPOSE: 'Transpose'
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
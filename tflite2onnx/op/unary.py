@@ -11,6 +11,7 @@ class Unary(Operator):
         tflite.BuiltinOperator.ABS: 'Abs',
         tflite.BuiltinOperator.SQRT: 'Sqrt',
     }
+    __slots__ = ()
 
     def __init__(self, TFactory, index):
         super().__init__(TFactory, index)
@@ -45,3 +46,12 @@ class Unary(Operator):
 
     def transform(self):
         pass
+
+
+# wrapper is used here to override Unary.type property
+class ReciprocalWrapper(Unary):
+    __slots__ = ()
+
+    @property
+    def type(self):
+        return 'Reciprocal'
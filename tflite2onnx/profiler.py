@@ -0,0 +1,198 @@
+import logging
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from tflite2onnx import mapping
+
+logger = logging.getLogger('tflite2onnx')
+
+
+class _Phase:
+    """Context manager that records a phase into `Profiler`."""
+    def __init__(self, profiler, records, name):
+        self.profiler = profiler
+        self.records = records
+        self.name = name
+        self.start = None
+        self.peak = 0
+        self.rss = 0
+
+    def __enter__(self):
+        if self.profiler.memory:
+            self.profiler._enterMemory(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        record = self.records.setdefault(self.name, [0.0, 0, 0, 0])
+        record[0] += elapsed
+        record[1] += 1
+        if self.profiler.memory:
+            peak, rss = self.profiler._exitMemory(self)
+            record[2] = max(record[2], peak)
+            record[3] += rss
+        return False
+
+
+def _peakRSS():
+    """The peak resident set size of the process in bytes, 0 if unknown."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+class Profiler:
+    """Record wall time and call counts of the conversion phases and operator types.
+
+    Phases are recorded in the order they first run, nested phases are
+    recorded as their own. For operators, the time of parsing and converting
+    is accumulated per operator type.
+
+    With `memory`, the peak of memory allocated by Python (via `tracemalloc`)
+    within each phase, and how much each phase raised the peak RSS of the
+    process, are recorded as well, together with the biggest tensors of the
+    graph. The peak RSS only grows, so a phase that stays below the peak of
+    the ones before it adds nothing.
+    Note that tracing memory slows down the conversion noticeably.
+
+    ```py
+    profiler = tflite2onnx.Profiler()
+    tflite2onnx.convert(tflite_path, onnx_path, profiler=profiler)
+    print(profiler.report())
+    ```
+    """
+    def __init__(self, memory=False, top_tensors=10):
+        self.memory = memory
+        self.top_tensors = top_tensors
+        self.phases = dict()  # name -> [seconds, count, peak bytes, RSS growth bytes]
+        self.operators = dict()  # (type, step) -> [seconds, count, peak bytes, RSS growth bytes]
+        self.tensors = []  # (bytes, name, dtype, shape) of the biggest tensors
+        self._stack = []  # the phases being recorded
+        self._started_tracing = False
+
+    def phase(self, name):
+        return _Phase(self, self.phases, name)
+
+    def operator(self, op_type, step):
+        return _Phase(self, self.operators, (op_type, step))
+
+    def _enterMemory(self, phase):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        # the peak is reset for the new phase, keep the one of the outer phase
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            outer = self._stack[-1]
+            outer.peak = max(outer.peak, peak)
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        phase.peak = current
+        phase.rss = _peakRSS()
+        self._stack.append(phase)
+
+    def _exitMemory(self, phase):
+        _, peak = tracemalloc.get_traced_memory()
+        phase.peak = max(phase.peak, peak)
+        assert(self._stack.pop() is phase)
+        if self._stack:
+            outer = self._stack[-1]
+            outer.peak = max(outer.peak, phase.peak)
+        elif self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return phase.peak, _peakRSS() - phase.rss
+
+    def recordTensors(self, tensors):
+        """Record the biggest ones of `tensors` by the size of their data, in memory mode."""
+        if not self.memory:
+            return
+        for t in tensors:
+            if isinstance(t.data, np.ndarray):
+                dtype = mapping.DTYPE_ONNX2NAME.get(t.dtype, str(t.data.dtype))
+                self.tensors.append((t.data.nbytes, t.name, dtype, tuple(t.shape)))
+        self.tensors.sort(key=lambda r: -r[0])
+        del self.tensors[self.top_tensors:]
+
+    def asDict(self):
+        """The records as plain dicts, e.g. to dump as JSON."""
+        def record(r):
+            d = {'seconds': r[0], 'count': r[1]}
+            if self.memory:
+                d['peak_bytes'] = r[2]
+                d['rss_growth_bytes'] = r[3]
+            return d
+
+        phases = {name: record(r) for name, r in self.phases.items()}
+        operators = dict()
+        for (op_type, step), r in self.operators.items():
+            operators.setdefault(op_type, dict())[step] = record(r)
+        ret = {'phases': phases, 'operators': operators}
+        if self.memory:
+            ret['tensors'] = [{'name': n, 'dtype': d, 'shape': list(s), 'bytes': b}
+                              for b, n, d, s in self.tensors]
+        return ret
+
+    def report(self):
+        """A readable report of the records, as tables."""
+        MB = 1024 * 1024
+        if self.memory:
+            header = ('Phase', 'Time(ms)', 'Count', 'Peak(MB)', 'RSSGrowth(MB)')
+            lines = ['%-32s %10s %8s %10s %14s' % header]
+        else:
+            lines = ['%-32s %10s %8s' % ('Phase', 'Time(ms)', 'Count')]
+        for name, (s, c, peak, rss) in self.phases.items():
+            line = '%-32s %10.2f %8d' % (name, s * 1000, c)
+            if self.memory:
+                line += ' %10.2f %14.2f' % (peak / MB, rss / MB)
+            lines.append(line)
+
+        lines.append('')
+        lines.append('%-32s %8s %10s %12s' % ('Operator', 'Count', 'Parse(ms)', 'Convert(ms)'))
+        stats = self.asDict()['operators']
+        for op_type in sorted(stats, key=lambda t: -sum(r['seconds'] for r in stats[t].values())):
+            parse = stats[op_type].get('parse', {'seconds': 0.0, 'count': 0})
+            convert = stats[op_type].get('convert', {'seconds': 0.0, 'count': 0})
+            count = max(parse['count'], convert['count'])
+            lines.append('%-32s %8d %10.2f %12.2f' % (op_type, count, parse['seconds'] * 1000,
+                                                      convert['seconds'] * 1000))
+
+        if self.memory:
+            lines.append('')
+            lines.append('%-48s %8s %10s  %s' % ('Tensor', 'DType', 'Size(MB)', 'Shape'))
+            for b, name, dtype, shape in self.tensors:
+                lines.append('%-48s %8s %10.2f  %s' % (name, dtype, b / MB, list(shape)))
+        return '\n'.join(lines)
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class NullProfiler:
+    """The profiler that records nothing, used when profiling is not requested."""
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def operator(self, op_type, step):
+        return self._phase
+
+    def recordTensors(self, tensors):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
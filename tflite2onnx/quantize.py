@@ -21,15 +21,14 @@ def handleQuantizationTensor(TFactory, t):
     To identify bias, the functionality needs to be called by operator?
 
     We need the `<t1/i>` only because the quantization parameters and
-    producer and consumers of it can be easily obtained. For the inserted
-    operators, store them in `t1.producers[0].post` or `t1.consumers[0].pre`
-    if `<t1/i>` has no producer. Then modify the graph.
+    producer and consumers of it can be easily obtained. The inserted
+    operators join the graph once linked with `<t1>`.
+
+    The tensor should have been dequantized by the caller, such that the
+    data of quantized initializers can be dequantized in parallel ahead.
     """
-    if not t.quantized:
-        return t
     logger.debug("Generating quantization pattern for {}".format(t.name))
-
-    t.dequantize()
+    assert(t.dtype == TensorProto.FLOAT)
 
     if t.is_bias:
         # Bias is INT32, which cannot be processed by Quantize/Dequantize.
@@ -71,23 +70,12 @@ def handleQuantizationTensor(TFactory, t):
     qtensor.addConsumer(deqop)
     deqtensor.addProducer(deqop)
 
-    # add Quantize/Dequantize to graph
-    if t.producers:
-        master_op = t.producers[0]
-        master_op.post.insert(0, deqop)
-        master_op.post.insert(0, qop)
-    elif t.consumers:
-        master_op = t.consumers[0]
-        master_op.pre.insert(0, deqop)
-        master_op.pre.insert(0, qop)
-    else:
-        assert(False), "No place to add op"
-
     # link pattern to graph
-    for c in t.consumers:
+    assert(t.producers or t.consumers), "No place to add op"
+    for c in list(t.consumers):
         c.replaceInput(t, deqtensor)
         deqtensor.addConsumer(c)
-    t.consumers.clear()
+        t.removeConsumer(c)
     t.addConsumer(qop)
 
     return deqtensor
@@ -115,15 +103,16 @@ def foldFP16QuantPattern(ops):
 
         # attach the casted fp32 tensor to the op that consumes the output of the Dequantize
         fp32o = dep.outputs[0]
-        for op in fp32o.consumers:
+        for op in list(fp32o.consumers):
             op.replaceInput(fp32o, fp32i)
             fp32i.addConsumer(op)
+            fp32o.removeConsumer(op)
         fp32i.removeConsumer(dep)
 
-        # remove Dequantize operator
+        # remove Dequantize operator, the unneeded tensor is dropped from graph
+        # once it has no operator linked.
+        fp32o.removeProducer(dep)
         ops.remove(dep)
-        # the unneeded tensos will be removed in graph automatically
-        # graph.value_info.remove(fp32o)
         count += 1
 
     if count > 0:
@@ -0,0 +1,300 @@
+import itertools
+import logging
+from collections import deque
+
+import numpy as np
+from onnx import TensorProto
+
+from tflite2onnx.op.unary import ReciprocalWrapper
+
+logger = logging.getLogger('tflite2onnx')
+
+
+class Value:
+    """Match any tensor, captured as `name` if given."""
+    def __init__(self, name=None):
+        self.name = name
+
+    def matchTensor(self, t, captures):
+        if self.name is not None:
+            captures[self.name] = t
+        return True
+
+
+class Constant(Value):
+    """Match an initializer, of which every element equals `value` if given."""
+    def __init__(self, name=None, value=None):
+        super().__init__(name)
+        self.value = value
+
+    def matchTensor(self, t, captures):
+        if not t.isInitializer:
+            return False
+        if self.value is not None:
+            data = np.asarray(t.data)
+            if data.size == 0 or not np.all(data == self.value):
+                return False
+        return super().matchTensor(t, captures)
+
+
+class Pattern:
+    """Match an operator of `type` whose inputs match `inputs` in order.
+
+    Each of `inputs` is a `Value` or `Constant` to match the input tensor, or a
+    `Pattern` to match the operator that produces it. The matched operator is
+    captured as `name` if given. The operators matched by inner patterns may
+    have other consumers, which a rule needs to check if it removes them.
+    """
+    def __init__(self, type, *inputs, name=None):
+        self.type = type
+        self.inputs = inputs
+        self.name = name
+
+    def match(self, op, captures):
+        if op.type != self.type or len(op.inputs) != len(self.inputs):
+            return False
+        for t, p in zip(op.inputs, self.inputs):
+            if not p.matchTensor(t, captures):
+                return False
+        if self.name is not None:
+            captures[self.name] = op
+        return True
+
+    def matchTensor(self, t, captures):
+        if len(t.producers) != 1:
+            return False
+        return self.match(t.producers[0], captures)
+
+
+class Rule:
+    """A peephole rewrite of the operators that `pattern` matches.
+
+    `check()` tells whether the captures of a match can be rewritten, and
+    `apply()` rewrites them with the helpers of `Rewriter`.
+    """
+    pattern = None
+
+    def check(self, rewriter, captures):
+        return True
+
+    def apply(self, rewriter, captures):
+        raise NotImplementedError("Method %s.apply() must be overrided!" % type(self).__name__)
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+
+RULES = []
+
+
+def registerRule(rule):
+    """Register a `Rule` subclass as built-in, which `Rewriter` applies by default."""
+    assert(all(type(r) is not rule for r in RULES))
+    RULES.append(rule())
+    return rule
+
+
+class Rewriter:
+    """Apply peephole rewrite rules across the graph until none matches.
+
+    Operators are visited with a worklist. Once a rule is applied, the
+    operators around the tensors it touched are visited again, such that a
+    rewrite can enable others. Rules must keep the graph outputs produced.
+    """
+    def __init__(self, graph, rules=None):
+        self.graph = graph
+        self.TFactory = graph.TFactory
+        self.rules = dict()
+        for rule in (RULES if rules is None else rules):
+            self.rules.setdefault(rule.pattern.type, []).append(rule)
+        self.worklist = deque()
+        self.applied = dict()
+
+    def rewrite(self):
+        self.worklist.extend(self.graph.op_all)
+        while self.worklist:
+            op = self.worklist.popleft()
+            if op not in self.graph.graph_index.op_links:
+                # removed since queued
+                continue
+            for rule in self.rules.get(op.type, []):
+                captures = dict()
+                if rule.pattern.match(op, captures) and rule.check(self, captures):
+                    logger.debug("Rewriter: applying %s to %s", rule.name, op.shorty)
+                    rule.apply(self, captures)
+                    self.applied[rule.name] = self.applied.get(rule.name, 0) + 1
+                    break
+
+        # drop the removed ones from the TFLite operators
+        self.graph.ops = [op for op in self.graph.ops if op in self.graph.graph_index.op_links]
+        if self.applied:
+            applied = ', '.join('%s x%d' % item for item in self.applied.items())
+            logger.info("Rewriter: %d rewrites are applied: %s",
+                        sum(self.applied.values()), applied)
+        return sum(self.applied.values())
+
+    def isOutput(self, t):
+        return any(t is o for o in self.graph.outputs)
+
+    def replaceInput(self, op, original, new):
+        op.replaceInput(original, new)
+        original.removeConsumer(op)
+        new.addConsumer(op)
+        self.revisit(original)
+        self.revisit(new)
+
+    def revisit(self, t):
+        """Queue the operators around `t`, of which the producer or consumers have changed."""
+        self.worklist.extend(itertools.chain(t.producers, t.consumers))
+
+    def remove(self, op):
+        """Unlink `op` from the graph, the tensors only it links are dropped."""
+        for t in op.inputs:
+            t.removeConsumer(op)
+            self.revisit(t)
+        for t in op.outputs:
+            t.removeProducer(op)
+            self.revisit(t)
+
+    def removeIfDead(self, op):
+        """Remove `op` if none of its outputs is used, return whether removed."""
+        if any(len(t.consumers) > 0 or self.isOutput(t) for t in op.outputs):
+            return False
+        self.remove(op)
+        return True
+
+    def insert(self, op):
+        """Link `op` into the graph, of which the inputs and outputs are set."""
+        for t in op.inputs:
+            t.addConsumer(op)
+        for t in op.outputs:
+            t.addProducer(op)
+        op.setParsed()
+        for t in op.inputs + op.outputs:
+            self.revisit(t)
+
+    def replace(self, op, new):
+        """Replace `op` with `new`, of which the inputs and outputs are set but not linked."""
+        self.remove(op)
+        if new.name is None:
+            new.name = op.name
+        self.insert(new)
+
+
+@registerRule
+class PowerOfMinusOne(Rule):
+    """`Pow(x, -1)` -> `Reciprocal(x)`.
+
+    `Rsqrt` is converted as `Pow(Sqrt(x), -1)`, of which the exponent is a
+    full-shape initializer. The exponent must not broadcast the output.
+    """
+    pattern = Pattern('Pow', Value('x'), Constant('exponent', -1), name='pow')
+
+    def check(self, rewriter, captures):
+        x = captures['x']
+        return (x.dtype in (TensorProto.FLOAT, TensorProto.FLOAT16, TensorProto.DOUBLE) and
+                captures['pow'].outputs[0].shape == x.shape)
+
+    def apply(self, rewriter, captures):
+        power = captures['pow']
+        reciprocal = ReciprocalWrapper(rewriter.TFactory, -1)
+        reciprocal.inputs.append(captures['x'])
+        reciprocal.outputs.append(power.outputs[0])
+        rewriter.replace(power, reciprocal)
+
+
+def _spatialPads(t):
+    """`[h_begin, w_begin, h_end, w_end]` of ONNX NCHW `pads` if only H and W are padded."""
+    pads = [int(p) for p in np.asarray(t.data).flatten()]
+    if len(pads) != 8 or any(p < 0 for p in pads):
+        return None
+    if any(pads[i] != 0 for i in (0, 1, 4, 5)):
+        return None
+    return [pads[2], pads[3], pads[6], pads[7]]
+
+
+def _isNonNegative(t):
+    if len(t.producers) != 1:
+        return False
+    producer = t.producers[0]
+    if producer.type == 'Relu':
+        return True
+    if producer.type == 'Clip' and len(producer.inputs) > 1:
+        minimum = producer.inputs[1]
+        return minimum.isInitializer and bool(np.all(np.asarray(minimum.data) >= 0))
+    return False
+
+
+def _padPattern():
+    return Pattern('Pad', Value('x'), Constant('pads'), name='pad')
+
+
+class FoldPad(Rule):
+    """`Op(Pad(x))` -> `Op(x)` with the pads added to `pads` of `Op`.
+
+    TFLite `PAD` pads zeros. It is folded if only the spatial dimensions are
+    padded and nothing else takes the padded tensor. Subclasses match the
+    operator as `op` and check whether it takes the zeros the same way.
+    """
+    def check(self, rewriter, captures):
+        padded = captures['pad'].outputs[0]
+        return (captures['pad'].attrs['mode'] == 'constant' and
+                _spatialPads(captures['pads']) is not None and
+                len(padded.consumers) == 1 and not rewriter.isOutput(padded))
+
+    def apply(self, rewriter, captures):
+        op = captures['op']
+        pad = captures['pad']
+        pads = _spatialPads(captures['pads'])
+        op.attrs['pads'] = [int(p) + q for p, q in zip(op.attrs['pads'], pads)]
+        rewriter.replaceInput(op, pad.outputs[0], captures['x'])
+        rewriter.remove(pad)
+
+
+@registerRule
+class FoldPadConv(FoldPad):
+    """Zeros padded are the same as the ones of `Conv` pads."""
+    pattern = Pattern('Conv', _padPattern(), Value(), Value(), name='op')
+
+
+class FoldPadPooling(FoldPad):
+    """Pooling takes the padded zeros unlike the ones of its pads.
+
+    The padded ones are folded only if every window covers some of `x`.
+    """
+    def check(self, rewriter, captures):
+        if not super().check(rewriter, captures):
+            return False
+        op = captures['op']
+        pads = [int(p) + q for p, q in zip(op.attrs['pads'], _spatialPads(captures['pads']))]
+        kernel = op.attrs['kernel_shape']
+        return all(pads[i] < kernel[i % 2] for i in range(4))
+
+
+@registerRule
+class FoldPadAveragePool(FoldPadPooling):
+    """`AveragePool` counts the zeros in, if its own pads are counted too or are none."""
+    pattern = Pattern('AveragePool', _padPattern(), name='op')
+
+    def check(self, rewriter, captures):
+        op = captures['op']
+        counted = (op.attrs.get('count_include_pad', 0) == 1 or
+                   all(int(p) == 0 for p in op.attrs['pads']))
+        return counted and super().check(rewriter, captures)
+
+    def apply(self, rewriter, captures):
+        super().apply(rewriter, captures)
+        captures['op'].attrs['count_include_pad'] = 1
+
+
+@registerRule
+class FoldPadMaxPool(FoldPadPooling):
+    """`MaxPool` ignores the pads, which is the same if `x` is not negative.
+
+    That is the case if `x` is produced by `Relu`, or `Clip` of non-negative minimum.
+    """
+    pattern = Pattern('MaxPool', _padPattern(), name='op')
+
+    def check(self, rewriter, captures):
+        return super().check(rewriter, captures) and _isNonNegative(captures['x'])
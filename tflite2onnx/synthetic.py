@@ -0,0 +1,358 @@
+"""Generate synthetic TFLite models of configurable size, for scaling tests and benchmarks.
+
+The models are built with the flatbuffer schema of the `tflite` package, no
+TensorFlow is needed. A model is a chain of blocks on an NHWC activation,
+each block is one of `BLOCKS`. Weights are random but reproducible with
+`seed`.
+
+    buf = generate(2000, mix=('conv', 'reshape'), quantized=True)
+"""
+import argparse
+import importlib
+import logging
+
+import flatbuffers
+import numpy as np
+import tflite
+
+from tflite2onnx import mapping
+
+logger = logging.getLogger('tflite2onnx')
+
+BLOCKS = ('conv', 'add', 'reshape', 'concat', 'fanout')
+
+
+def _schema(name):
+    # `tflite.X` is the class, while the builder functions are in the module
+    return importlib.import_module('tflite.' + name)
+
+
+class ModelBuilder:
+    """Describe a TFLite model in Python, and serialize it with `build()`."""
+    def __init__(self):
+        self.tensors = []  # (name, shape, dtype, buffer index, (scale, zero point) or None)
+        self.buffers = [None]  # data of buffers, the 0th is the empty one by convention
+        self.opcodes = []  # builtin opcodes
+        self.operators = []  # (opcode index, inputs, outputs, options)
+        self.inputs = []
+        self.outputs = []
+
+    def addTensor(self, name, shape, dtype='float32', data=None, quant=None):
+        """Add a tensor, a constant one if `data` is given, return its index."""
+        buffer = 0
+        if data is not None:
+            data = np.asarray(data, dtype=dtype)
+            assert(data.shape == tuple(shape))
+            self.buffers.append(data.tobytes())
+            buffer = len(self.buffers) - 1
+        self.tensors.append((name, tuple(shape), dtype, buffer, quant))
+        return len(self.tensors) - 1
+
+    def addOperator(self, opcode, inputs, outputs, options=None):
+        """Add an operator, `options` is the name of the options table and its fields.
+
+        For example, `('AddOptions', {'FusedActivationFunction': 1})`.
+        """
+        if opcode not in self.opcodes:
+            self.opcodes.append(opcode)
+        self.operators.append((self.opcodes.index(opcode), inputs, outputs, options))
+
+    def build(self):
+        """Serialize the model, return the buffer of TFLite model."""
+        b = flatbuffers.Builder(1024)
+        buffers = [self._buildBuffer(b, data) for data in self.buffers]
+        tensors = [self._buildTensor(b, *t) for t in self.tensors]
+        operators = [self._buildOperator(b, *op) for op in self.operators]
+        opcodes = [self._buildOpcode(b, opc) for opc in self.opcodes]
+
+        SubGraph = _schema('SubGraph')
+        tensors = _offsetVector(b, SubGraph.SubGraphStartTensorsVector, tensors)
+        operators = _offsetVector(b, SubGraph.SubGraphStartOperatorsVector, operators)
+        inputs = b.CreateNumpyVector(np.array(self.inputs, dtype='int32'))
+        outputs = b.CreateNumpyVector(np.array(self.outputs, dtype='int32'))
+        name = b.CreateString('main')
+        SubGraph.SubGraphStart(b)
+        SubGraph.SubGraphAddTensors(b, tensors)
+        SubGraph.SubGraphAddInputs(b, inputs)
+        SubGraph.SubGraphAddOutputs(b, outputs)
+        SubGraph.SubGraphAddOperators(b, operators)
+        SubGraph.SubGraphAddName(b, name)
+        subgraph = SubGraph.SubGraphEnd(b)
+
+        Model = _schema('Model')
+        subgraphs = _offsetVector(b, Model.ModelStartSubgraphsVector, [subgraph])
+        opcodes = _offsetVector(b, Model.ModelStartOperatorCodesVector, opcodes)
+        buffers = _offsetVector(b, Model.ModelStartBuffersVector, buffers)
+        description = b.CreateString('tflite2onnx synthetic model')
+        Model.ModelStart(b)
+        Model.ModelAddVersion(b, 3)
+        Model.ModelAddOperatorCodes(b, opcodes)
+        Model.ModelAddSubgraphs(b, subgraphs)
+        Model.ModelAddDescription(b, description)
+        Model.ModelAddBuffers(b, buffers)
+        b.Finish(Model.ModelEnd(b), file_identifier=b'TFL3')
+        return b.Output()
+
+    @staticmethod
+    def _buildBuffer(b, data):
+        Buffer = _schema('Buffer')
+        if data is not None:
+            b.StartVector(1, len(data), 16)
+            b.head = b.head - len(data)
+            b.Bytes[b.head:b.head + len(data)] = data
+            data = _endVector(b, len(data))
+        Buffer.BufferStart(b)
+        if data is not None:
+            Buffer.BufferAddData(b, data)
+        return Buffer.BufferEnd(b)
+
+    @staticmethod
+    def _buildTensor(b, name, shape, dtype, buffer, quant):
+        Tensor = _schema('Tensor')
+        QuantizationParameters = _schema('QuantizationParameters')
+        name = b.CreateString(name)
+        shape = b.CreateNumpyVector(np.array(shape, dtype='int32'))
+        if quant is not None:
+            scale = b.CreateNumpyVector(np.array([quant[0]], dtype='float32'))
+            zero_point = b.CreateNumpyVector(np.array([quant[1]], dtype='int64'))
+            QuantizationParameters.QuantizationParametersStart(b)
+            QuantizationParameters.QuantizationParametersAddScale(b, scale)
+            QuantizationParameters.QuantizationParametersAddZeroPoint(b, zero_point)
+            quant = QuantizationParameters.QuantizationParametersEnd(b)
+        Tensor.TensorStart(b)
+        Tensor.TensorAddShape(b, shape)
+        Tensor.TensorAddType(b, mapping.DTYPE_NAME2TFLITE[dtype])
+        Tensor.TensorAddBuffer(b, buffer)
+        Tensor.TensorAddName(b, name)
+        if quant is not None:
+            Tensor.TensorAddQuantization(b, quant)
+        return Tensor.TensorEnd(b)
+
+    @staticmethod
+    def _buildOperator(b, opcode_index, inputs, outputs, options):
+        Operator = _schema('Operator')
+        if options is not None:
+            options_name, fields = options
+            Options = _schema(options_name)
+            getattr(Options, options_name + 'Start')(b)
+            for field, value in fields.items():
+                getattr(Options, options_name + 'Add' + field)(b, value)
+            options_offset = getattr(Options, options_name + 'End')(b)
+        inputs = b.CreateNumpyVector(np.array(inputs, dtype='int32'))
+        outputs = b.CreateNumpyVector(np.array(outputs, dtype='int32'))
+        Operator.OperatorStart(b)
+        Operator.OperatorAddOpcodeIndex(b, opcode_index)
+        Operator.OperatorAddInputs(b, inputs)
+        Operator.OperatorAddOutputs(b, outputs)
+        if options is not None:
+            Operator.OperatorAddBuiltinOptionsType(b, getattr(tflite.BuiltinOptions, options_name))
+            Operator.OperatorAddBuiltinOptions(b, options_offset)
+        return Operator.OperatorEnd(b)
+
+    @staticmethod
+    def _buildOpcode(b, opcode):
+        OperatorCode = _schema('OperatorCode')
+        OperatorCode.OperatorCodeStart(b)
+        # the deprecated int8 field is still read by older runtimes
+        deprecated = min(opcode, tflite.BuiltinOperator.PLACEHOLDER_FOR_GREATER_OP_CODES)
+        OperatorCode.OperatorCodeAddDeprecatedBuiltinCode(b, deprecated)
+        OperatorCode.OperatorCodeAddBuiltinCode(b, opcode)
+        OperatorCode.OperatorCodeAddVersion(b, 1)
+        return OperatorCode.OperatorCodeEnd(b)
+
+
+def _offsetVector(b, start, offsets):
+    start(b, len(offsets))
+    for o in reversed(offsets):
+        b.PrependUOffsetTRelative(o)
+    return _endVector(b, len(offsets))
+
+
+def _endVector(b, num_elems):
+    try:
+        return b.EndVector()
+    except TypeError:
+        # flatbuffers 1.x requires the number of elements
+        return b.EndVector(num_elems)
+
+
+class _Generator:
+    """Append blocks to a `ModelBuilder`, tracking the current activation."""
+    # (scale, zero point) of the quantized tensors
+    ACT_QUANT = (0.05, 128)
+    WEIGHT_QUANT = (0.01, 128)
+
+    def __init__(self, builder, channels, size, kernel_size, fan_out, quantized, seed):
+        self.builder = builder
+        self.channels = channels
+        self.size = size
+        self.kernel_size = kernel_size
+        self.fan_out = fan_out
+        self.quantized = quantized
+        self.rng = np.random.RandomState(seed)
+        self.dtype = 'uint8' if quantized else 'float32'
+        self.act_quant = self.ACT_QUANT if quantized else None
+
+        self.x = self.activation('input', channels)
+        self.prev = self.x
+        builder.inputs.append(self.x)
+
+    def activation(self, name, channels):
+        shape = (1, self.size, self.size, channels)
+        return self.builder.addTensor(name, shape, self.dtype, quant=self.act_quant)
+
+    def weight(self, name, shape):
+        if self.quantized:
+            data = self.rng.randint(0, 256, size=shape)
+            return self.builder.addTensor(name, shape, 'uint8', data, self.WEIGHT_QUANT)
+        fan_in = int(np.prod(shape[1:]))
+        data = self.rng.standard_normal(shape) / np.sqrt(fan_in)
+        return self.builder.addTensor(name, shape, 'float32', data)
+
+    def bias(self, name, channels):
+        if self.quantized:
+            scale = self.ACT_QUANT[0] * self.WEIGHT_QUANT[0]
+            data = self.rng.randint(-1000, 1000, size=(channels,))
+            return self.builder.addTensor(name, (channels,), 'int32', data, (scale, 0))
+        data = self.rng.standard_normal((channels,)) * 0.1
+        return self.builder.addTensor(name, (channels,), 'float32', data)
+
+    def residual(self, name):
+        """The input of the previous block, or a constant one for the first block."""
+        if self.prev != self.x:
+            return self.prev
+        # the converter doesn't take one tensor as two inputs of an operator
+        shape = (1, self.size, self.size, self.channels)
+        if self.quantized:
+            data = self.rng.randint(0, 256, size=shape)
+        else:
+            data = self.rng.standard_normal(shape)
+        return self.builder.addTensor(name, shape, self.dtype, data, self.act_quant)
+
+    def conv(self, name, x, ic, oc, kernel_size):
+        w = self.weight(name + '/weight', (oc, kernel_size, kernel_size, ic))
+        b = self.bias(name + '/bias', oc)
+        y = self.activation(name + '/output', oc)
+        options = ('Conv2DOptions', {
+            'Padding': tflite.Padding.SAME,
+            'StrideW': 1,
+            'StrideH': 1,
+            'FusedActivationFunction': tflite.ActivationFunctionType.RELU,
+        })
+        self.builder.addOperator(tflite.BuiltinOperator.CONV_2D, [x, w, b], [y], options)
+        return y
+
+    def concat(self, name, inputs, channels):
+        y = self.activation(name + '/output', channels)
+        options = ('ConcatenationOptions', {'Axis': 3})
+        self.builder.addOperator(tflite.BuiltinOperator.CONCATENATION, inputs, [y], options)
+        return y
+
+    def blockConv(self, name):
+        C = self.channels
+        return self.conv(name + '/conv', self.x, C, C, self.kernel_size)
+
+    def blockAdd(self, name):
+        # a residual connection to the input of the previous block
+        residual = self.residual(name + '/residual')
+        y = self.activation(name + '/output', self.channels)
+        options = ('AddOptions', {'FusedActivationFunction': tflite.ActivationFunctionType.NONE})
+        self.builder.addOperator(tflite.BuiltinOperator.ADD, [self.x, residual], [y], options)
+        return y
+
+    def blockReshape(self, name):
+        S, C = self.size, self.channels
+        x = self.x
+        for i, shape in enumerate(((1, S * S, C), (1, S, S, C))):
+            st = self.builder.addTensor('%s/shape%d' % (name, i), (len(shape),), 'int32', shape)
+            y = self.builder.addTensor('%s/output%d' % (name, i), shape, self.dtype,
+                                       quant=self.act_quant)
+            options = ('ReshapeOptions', dict())
+            self.builder.addOperator(tflite.BuiltinOperator.RESHAPE, [x, st], [y], options)
+            x = y
+        return x
+
+    def blockConcat(self, name):
+        C = self.channels
+        residual = self.residual(name + '/residual')
+        y = self.concat(name + '/concat', [self.x, residual], 2 * C)
+        return self.conv(name + '/conv', y, 2 * C, C, 1)
+
+    def blockFanout(self, name):
+        C = self.channels
+        branches = [self.conv('%s/branch%d' % (name, i), self.x, C, C, 1)
+                    for i in range(self.fan_out)]
+        y = self.concat(name + '/concat', branches, self.fan_out * C)
+        return self.conv(name + '/conv', y, self.fan_out * C, C, 1)
+
+    def append(self, block, index):
+        func = getattr(self, 'block' + block.capitalize())
+        y = func('block%d_%s' % (index, block))
+        self.prev = self.x
+        self.x = y
+
+
+def generate(num_ops, mix=BLOCKS, channels=16, size=16, kernel_size=3, fan_out=4,
+             quantized=False, seed=0):
+    """Generate a TFLite model of about `num_ops` operators, return the model buffer.
+
+    Args:
+        num_ops (int): blocks are appended until the model has this many operators.
+        mix (sequence of str): the blocks to append in turn, each one of `BLOCKS`.
+            `conv` is a Conv2D, `add` is a residual Add, `reshape` is a pair of
+            Reshape to 3D and back, `concat` is a Concatenation followed by a
+            1x1 Conv2D, and `fanout` is `fan_out` parallel 1x1 Conv2D concatenated.
+        channels (int): the channels of activations, which scales weights too.
+        size (int): the height and width of activations.
+        kernel_size (int): the kernel height and width of the `conv` block.
+        fan_out (int): the branches of the `fanout` block.
+        quantized (bool): generate an uint8 quantized model rather than float.
+        seed (int): the seed of random weights.
+    """
+    for block in mix:
+        if block not in BLOCKS:
+            raise ValueError("Unknown block %s, should be one of %s!" % (block, BLOCKS))
+    if len(mix) == 0:
+        raise ValueError("No block to generate!")
+
+    builder = ModelBuilder()
+    gen = _Generator(builder, channels, size, kernel_size, fan_out, quantized, seed)
+    index = 0
+    while len(builder.operators) < num_ops:
+        gen.append(mix[index % len(mix)], index)
+        index += 1
+    builder.outputs.append(gen.x)
+    logger.debug("Generated a synthetic model of %d operators and %d tensors",
+                 len(builder.operators), len(builder.tensors))
+    return builder.build()
+
+
+def cmd_generate():
+    parser = argparse.ArgumentParser(description="Generate a synthetic TFLite model")
+    parser.add_argument('tflite_path', help="Path to save the generated TFLite model")
+    parser.add_argument('--num-ops', type=int, default=1000,
+                        help="Number of operators (default: %(default)s)")
+    parser.add_argument('--mix', default=','.join(BLOCKS),
+                        help="Comma separated blocks to append in turn (default: %(default)s)")
+    parser.add_argument('--channels', type=int, default=16,
+                        help="Channels of activations (default: %(default)s)")
+    parser.add_argument('--size', type=int, default=16,
+                        help="Height and width of activations (default: %(default)s)")
+    parser.add_argument('--kernel-size', type=int, default=3,
+                        help="Kernel size of the conv block (default: %(default)s)")
+    parser.add_argument('--fan-out', type=int, default=4,
+                        help="Branches of the fanout block (default: %(default)s)")
+    parser.add_argument('--quantized', action='store_true',
+                        help="Generate an uint8 quantized model")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed of random weights (default: %(default)s)")
+    args = parser.parse_args()
+
+    buf = generate(args.num_ops, args.mix.split(','), args.channels, args.size,
+                   args.kernel_size, args.fan_out, args.quantized, args.seed)
+    with open(args.tflite_path, 'wb') as f:
+        f.write(buf)
+
+
+if __name__ == '__main__':
+    cmd_generate()
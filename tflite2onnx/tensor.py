@@ -6,15 +6,19 @@ from onnx import helper, numpy_helper, TensorProto
 
 from tflite2onnx import mapping
 from tflite2onnx.common import T2OBase
+from tflite2onnx.constant import contentKey
 
 logger = logging.getLogger('tflite2onnx')
 
 
 class Tensor(T2OBase):
-    def __init__(self, model, graph, index, layout=None, is_bias=False):
+    __slots__ = ('shape', 'dtype', 'data', 'scale', 'zero_point', 'layout', 'transformed',
+                 'producers', 'consumers', 'is_bias', 'graph_index')
+
+    def __init__(self, model, graph, index, layout=None, is_bias=False, graph_index=None):
         super().__init__(model, graph, index)
         self.tflite = graph.Tensors(index) if index >= 0 else None
-        self.shape = []
+        self.shape = ()  # tuple, such that it can be shared rather than copied
         self.dtype = None
         self.data = None
 
@@ -23,47 +27,71 @@ class Tensor(T2OBase):
         self.zero_point = 127
 
         self.layout = layout
+        # whether `shape` and `data` have been transformed w.r.t. `layout`
+        self.transformed = False
+        # At most one producer, while consumers can be many. Consumers are
+        # kept as keys of a dict, i.e. an insertion ordered set, such that
+        # rewiring them is O(1) and iterating them is deterministic.
         self.producers = []
-        self.consumers = []
+        self.consumers = dict()
 
         # we only accept INT32 as quantized tensor type for bias
         self.is_bias = is_bias
 
+        # the `GraphIndex` to report to when linked with operators
+        self.graph_index = graph_index
+
         self.setInited()
 
     @property
     def isInitializer(self):
         return self.data is not None
 
+    def _link(self, op):
+        if self.graph_index is not None:
+            self.graph_index.link(self, op)
+
+    def _unlink(self, op):
+        if self.graph_index is not None:
+            self.graph_index.unlink(self, op)
+
     def addProducer(self, op):
         assert(len(self.producers) == 0)
         self.producers.append(op)
         assert(len(self.producers) == 1)
+        self._link(op)
 
     def removeProducer(self, op):
         assert(len(self.producers) == 1)
         assert(self.producers[0] == op)
         self.producers.remove(op)
+        self._unlink(op)
 
     def replaceProducer(self, original, new):
         assert(len(self.producers) == 1)
         assert(self.producers[0] == original)
         self.producers[0] = new
+        self._unlink(original)
+        self._link(new)
 
     def addConsumer(self, op):
         assert(op not in self.consumers)
-        self.consumers.append(op)
+        self.consumers[op] = None
+        self._link(op)
 
     def removeConsumer(self, op):
         assert(op in self.consumers)
-        self.consumers.remove(op)
+        del self.consumers[op]
+        self._unlink(op)
 
     def replaceConsumer(self, original, new):
+        """Replace consumer `original` with `new`, which is iterated as the last one."""
         assert(original in self.consumers)
-        for i, op in enumerate(self.consumers):
-            if op is original:
-                self.consumers[i] = new
-                return
+        assert(new not in self.consumers)
+        del self.consumers[original]
+        self.consumers[new] = None
+        self._unlink(original)
+        self._link(new)
 
     @property
     def quantized(self):
@@ -99,9 +127,10 @@ class Tensor(T2OBase):
         if self.status.parsed:
             return
         tensor = self.tflite
-        self.name = tensor.Name().decode('utf-8')
+        if self.name is None:
+            self.name = tensor.Name().decode('utf-8')
         logger.debug("Parsing %s...", self.name)
-        self.shape = [int(i) for i in tensor.ShapeAsNumpy()]
+        self.shape = tuple(int(i) for i in tensor.ShapeAsNumpy())
 
         assert(tensor.Type() in mapping.DTYPE_TFLITE2ONNX)
         self.dtype = mapping.DTYPE_TFLITE2ONNX[tensor.Type()]
@@ -118,15 +147,24 @@ class Tensor(T2OBase):
 
         self.setParsed()
 
-    def transform(self):
+    def transform(self, contiguous=False):
+        """Transform the shape, and the data if initializer, w.r.t. the layout.
+
+        The data is kept as a transposed view which is copied when serializing,
+        unless `contiguous`, where the copy is done here.
+        """
         assert(self.status.parsed)
         assert(self.layout is not None)
+        assert(not self.transformed)
         if self.isInitializer:
             data = self.data.reshape(self.shape)
-            self.shape = self.layout.transform(self.shape)
+            self.shape = tuple(self.layout.transform(self.shape))
             self.data = data.transpose(self.layout.perm)
+            if contiguous:
+                self.data = np.ascontiguousarray(self.data)
         else:
-            self.shape = self.layout.transform(self.shape)
+            self.shape = tuple(self.layout.transform(self.shape))
+        self.transformed = True
 
     def validate(self):
         if self.isInitializer:
@@ -135,6 +173,14 @@ class Tensor(T2OBase):
             assert(len(self.producers) <= 1), "Tensor should have 1 producer or no"
         assert(len(self.name) > 0), "Tensor must have valid name"
 
+    def check(self):
+        """Check the converted ONNX object with ONNX checker."""
+        assert(self.status.converted)
+        if self.isInitializer:
+            onnx.checker.check_tensor(self.onnx)
+        else:
+            onnx.checker.check_value_info(self.onnx)
+
     def convert(self):
         if self.status.converted:
             return
@@ -146,10 +192,8 @@ class Tensor(T2OBase):
                 self.onnx = numpy_helper.from_array(self.data, self.name)
             else:
                 self.onnx = helper.make_tensor(self.name, self.dtype, self.shape, self.data)
-            onnx.checker.check_tensor(self.onnx)
         else:
             self.onnx = helper.make_tensor_value_info(self.name, self.dtype, self.shape)
-            onnx.checker.check_value_info(self.onnx)
         assert(self.onnx)
 
         self.setConverted()
@@ -165,22 +209,38 @@ class Tensor(T2OBase):
 
 
 class TensorFactory:
-    """The Registery holds all tensors in a SubGraph of TFLite by a name->Tensor map."""
-    def __init__(self, model, graph):
+    """The Registery holds all tensors in a SubGraph of TFLite.
+
+    Tensors of TFLite are looked up by their index, of which the names are
+    decoded once when creating the factory. All tensors, including helper
+    tensors that have no TFLite peer, are registered by name as well.
+    """
+    def __init__(self, model, graph, graph_index=None):
         self.model = model
         self.graph = graph
-        self.registery = dict()
+        self.graph_index = graph_index
+        self.registery = dict()  # name -> Tensor
+        self.indexed = dict()  # TFLite tensor index -> Tensor
+        self.names = [graph.Tensors(i).Name().decode('utf-8')
+                      for i in range(graph.TensorsLength())]
+
+    def _newTensor(self, index, layout=None, is_bias=False):
+        return Tensor(self.model, self.graph, index, layout, is_bias, self.graph_index)
 
     def get(self, index, layout=None, is_bias=False):
-        tft = self.graph.Tensors(index)
-        name = tft.Name().decode('utf-8')
-        if name not in self.registery:
-            t = Tensor(self.model, self.graph, index, layout, is_bias)
-            self.registery[name] = t
-        else:
-            t = self.registery[name]
-            if t.layout is None:
-                t.layout = layout
+        t = self.indexed.get(index)
+        if t is None:
+            name = self.names[index]
+            if name in self.registery:
+                # TFLite tensors of the same name are the same one in ONNX
+                t = self.registery[name]
+            else:
+                t = self._newTensor(index, layout, is_bias)
+                t.name = name
+                self.registery[name] = t
+            self.indexed[index] = t
+        if t.layout is None:
+            t.layout = layout
         return t
 
     def getWithRef(self, ref, name, forceUnique=False):
@@ -190,11 +250,12 @@ class TensorFactory:
         quantization and so on. Some attributions will be removed.
         """
         if name not in self.registery:
-            t = Tensor(self.model, self.graph, -1)
+            t = self._newTensor(-1)
             t.name = name
             t.dtype = ref.dtype
-            t.layout = copy.deepcopy(ref.layout)
-            t.shape = copy.deepcopy(ref.shape)
+            t.layout = ref.layout
+            t.transformed = ref.transformed
+            t.shape = ref.shape
             t.scale = copy.deepcopy(ref.scale)
             t.zero_point = copy.deepcopy(ref.zero_point)
             self.registery[name] = t
@@ -208,11 +269,11 @@ class TensorFactory:
         return self._createScalarCore(name, dtype, value)
 
     def createVector(self, ndarray):
-        array2key = str(ndarray).replace(' ', '_')
-        dtype = str(ndarray.dtype)
-        name = 'TFLITE2ONNX_Vector_' + dtype + '_' + array2key
+        dtype, shape, digest = contentKey(ndarray)
+        shape2key = 'x'.join(str(d) for d in shape)
+        name = 'TFLITE2ONNX_Vector_' + dtype + '_' + shape2key + '_' + digest[:16]
         if name not in self.registery:
-            t = Tensor(self.model, self.graph, -1, None)
+            t = self._newTensor(-1)
             t.name = name
             t.dtype = mapping.DTYPE_NAME2ONNX[dtype]
             t.data = ndarray.copy()
@@ -226,18 +287,18 @@ class TensorFactory:
         logger.warning("Empty tensor used, please double confirm your code path!")
         name = 'TFLITE2ONNX_EmptyTensor'
         if name not in self.registery:
-            t = Tensor(self.model, self.graph, -1, None)
+            t = self._newTensor(-1)
             t.name = name
             t.dtype = mapping.DTYPE_NAME2ONNX['float32']
             t.data = []
-            t.shape = [0]
+            t.shape = (0,)
             t.setParsed()
             self.registery[name] = t
         return self.registery[name]
 
     def _createScalarCore(self, name, dtype, value):
         if name not in self.registery:
-            t = Tensor(self.model, self.graph, -1, None)
+            t = self._newTensor(-1)
             t.name = name
             t.dtype = mapping.DTYPE_NAME2ONNX[dtype]
             t.data = [value]  # cannot use NDArray for cases such as min/max of ReLU6
@@ -273,7 +334,11 @@ class TensorFactory:
         raw = model.Buffers(bi).DataAsNumpy()
         if isinstance(raw, int) and raw == 0:
             return None
+        # A read-only view into the model buffer rather than a copy, such that
+        # weights are not duplicated in memory. Any pass that changes the data
+        # must create a new array, e.g. `astype()`, rather than writing in place.
         data = np.frombuffer(raw, dtype=dtype)
+        data.flags.writeable = False
         if len(shape) > 0:
             data = data.reshape(shape)
-        return data.copy()
+        return data
@@ -0,0 +1,271 @@
+import itertools
+import logging
+from collections import deque
+
+import numpy as np
+
+from tflite2onnx.op.reshape import Reshape
+from tflite2onnx.op.transpose import Transpose
+
+logger = logging.getLogger('tflite2onnx')
+
+# Operators that compute elementwise, through which a transpose can be moved
+# as long as the other inputs are transposed the same way.
+ELEMENTWISE_OPS = {
+    'Abs',
+    'Add',
+    'Clip',
+    'Mul',
+    'Pow',
+    'Relu',
+    'Sigmoid',
+    'Sqrt',
+    'Sub',
+}
+
+
+def _perm(op):
+    return tuple(int(p) for p in op.attrs['perm'])
+
+
+def _isIdentity(perm):
+    return perm == tuple(range(len(perm)))
+
+
+def _inversePerm(perm):
+    inverse = [0] * len(perm)
+    for i, p in enumerate(perm):
+        inverse[p] = i
+    return tuple(inverse)
+
+
+def _keepsMemoryOrder(perm, shape):
+    """Whether transposing `shape` with `perm` only moves dimensions of size 1."""
+    moved = [p for p in perm if shape[p] != 1]
+    return moved == sorted(moved)
+
+
+def _producer(t, op_class):
+    if len(t.producers) == 1 and isinstance(t.producers[0], op_class):
+        return t.producers[0]
+    return None
+
+
+class TransposeOptimizer:
+    """Remove the `Transpose` operators that layout handling leaves behind.
+
+    `Reshape` inserts a `Transpose` before or after itself for tensors with
+    layout, and every transpose is a full copy at inference time. Working
+    on a worklist until nothing changes, this
+    * composes back-to-back transposes, and removes identity ones,
+    * turns a transpose that moves only dimensions of size 1 into a `Reshape`,
+    * merges back-to-back reshapes, and removes the ones that change nothing,
+    * sinks a transpose through elementwise operators, such that it can meet
+      and cancel with an inverse one below.
+
+    The graph outputs are kept as they are. This must be called after the
+    layouts have been propagated across the graph.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+        self.TFactory = graph.TFactory
+        self.worklist = deque()
+        self.removed = 0
+
+    def optimize(self):
+        before = self._countTransposes()
+        self.worklist.extend(op for op in self.graph.op_all if isinstance(op, (Transpose, Reshape)))
+        while self.worklist:
+            op = self.worklist.popleft()
+            if op not in self.graph.graph_index.op_links:
+                # removed since queued
+                continue
+            if isinstance(op, Transpose):
+                self._visitTranspose(op)
+            else:
+                self._visitReshape(op)
+
+        # drop the removed ones from the TFLite operators
+        self.graph.ops = [op for op in self.graph.ops if op in self.graph.graph_index.op_links]
+        after = self._countTransposes()
+        if before != after or self.removed > 0:
+            logger.info("Transpose Optimizer: %d Transpose are reduced to %d, %d operators "
+                        "are removed in total!", before, after, self.removed)
+
+    def _countTransposes(self):
+        return sum(1 for op in self.graph.graph_index.ops if isinstance(op, Transpose))
+
+    def _isOutput(self, t):
+        return any(t is o for o in self.graph.outputs)
+
+    def _visitTranspose(self, op):
+        x = op.inputs[0]
+        y = op.outputs[0]
+        perm = _perm(op)
+
+        if _isIdentity(perm) and self._bypass(op):
+            return
+
+        prev = _producer(x, Transpose)
+        if prev is not None:
+            # transpose(transpose(x, p0), p) == transpose(x, p0[p])
+            prev_perm = _perm(prev)
+            op.attrs['perm'] = tuple(prev_perm[p] for p in perm)
+            self._replaceInput(op, x, prev.inputs[0])
+            self._removeIfDead(prev)
+            self.worklist.append(op)
+            return
+
+        if _keepsMemoryOrder(perm, x.shape):
+            self._toReshape(op)
+            return
+
+        if len(y.consumers) == 1 and not self._isOutput(y):
+            consumer = next(iter(y.consumers))
+            if consumer.type in ELEMENTWISE_OPS and len(consumer.outputs) == 1:
+                self._sink(op, consumer)
+
+    def _visitReshape(self, op):
+        x = op.inputs[0]
+        y = op.outputs[0]
+        if x.shape == y.shape:
+            self._bypass(op)
+            return
+
+        prev = _producer(x, Reshape)
+        if prev is None or len(x.consumers) != 1 or self._isOutput(x):
+            return
+        shape = op.inputs[1]
+        if not shape.isInitializer or 0 in np.asarray(shape.data):
+            # zero copies the dimension from the input, which would be changed
+            return
+        self._replaceInput(op, x, prev.inputs[0])
+        self._removeIfDead(prev)
+        self.worklist.append(op)
+
+    def _replaceInput(self, op, original, new):
+        op.replaceInput(original, new)
+        original.removeConsumer(op)
+        new.addConsumer(op)
+
+    def _remove(self, op):
+        for t in op.inputs:
+            t.removeConsumer(op)
+        for t in op.outputs:
+            t.removeProducer(op)
+        self.removed += 1
+
+    def _removeIfDead(self, op):
+        if all(len(t.consumers) == 0 and not self._isOutput(t) for t in op.outputs):
+            self._remove(op)
+
+    def _bypass(self, op):
+        """Remove `op` that doesn't change data, its consumers take its input instead.
+
+        Return whether it is removed, which is not the case if `op` produces a
+        graph output, or a consumer takes its input already.
+        """
+        x = op.inputs[0]
+        y = op.outputs[0]
+        if self._isOutput(y) or any(c in x.consumers for c in y.consumers):
+            return False
+        logger.debug("Transpose Optimizer: bypassing %s", op.shorty)
+        for c in list(y.consumers):
+            self._replaceInput(c, y, x)
+        self._remove(op)
+        self._revisit(x)
+        return True
+
+    def _revisit(self, t):
+        """Queue the operators around `t`, of which the producer or consumers have changed."""
+        for op in itertools.chain(t.producers, t.consumers):
+            if isinstance(op, (Transpose, Reshape)):
+                self.worklist.append(op)
+
+    def _toReshape(self, op):
+        x = op.inputs[0]
+        y = op.outputs[0]
+        logger.debug("Transpose Optimizer: turning %s into Reshape", op.shorty)
+        shape = self.TFactory.createVector(np.array(y.shape, dtype='int64'))
+        reshape = Reshape(self.TFactory, -1)
+        reshape.name = op.name
+        reshape.inputs.append(x)
+        reshape.inputs.append(shape)
+        reshape.outputs.append(y)
+        x.replaceConsumer(op, reshape)
+        y.replaceProducer(op, reshape)
+        shape.addConsumer(reshape)
+        reshape.setParsed()
+        self.worklist.append(reshape)
+        self._revisit(y)
+
+    def _sinkInputs(self, op, perm):
+        """The inputs of elementwise `op` if the transpose `perm` is sunk below it.
+
+        Returns the new inputs and the transposes to remove, or `None` if an
+        input is neither transposed the same way nor a constant.
+        """
+        inverse = _inversePerm(perm)
+        inputs = []
+        removing = []
+        for t in op.inputs:
+            trans = _producer(t, Transpose)
+            if trans is not None and _perm(trans) == perm:
+                if len(t.consumers) != 1 or self._isOutput(t):
+                    return None
+                inputs.append(trans.inputs[0])
+                removing.append(trans)
+            elif t.isInitializer and np.size(t.data) == 1:
+                inputs.append(t)
+            elif t.isInitializer and len(t.shape) == len(perm):
+                inputs.append(self._transposeConstant(t, inverse))
+            else:
+                return None
+        if len(set(inputs)) != len(inputs):
+            return None
+        return inputs, removing
+
+    def _transposeConstant(self, t, perm):
+        name = 'TFLITE2ONNX_Transposed_%s_%s' % (t.name, ''.join(str(p) for p in perm))
+        transposed = self.TFactory.getWithRef(t, name)
+        if not transposed.isInitializer:
+            transposed.data = np.ascontiguousarray(np.reshape(t.data, t.shape).transpose(perm))
+            transposed.shape = transposed.data.shape
+            transposed.setParsed()
+        return transposed
+
+    def _sink(self, trans, op):
+        """Move `trans` below elementwise `op`, i.e. `op(T(a), T(b))` to `T(op(a, b))`."""
+        perm = _perm(trans)
+        sunk = self._sinkInputs(op, perm)
+        if sunk is None:
+            return
+        inputs, removing = sunk
+        logger.debug("Transpose Optimizer: sinking %s below %s", trans.shorty, op.shorty)
+
+        for original, new in zip(list(op.inputs), inputs):
+            if original is not new:
+                self._replaceInput(op, original, new)
+        for t in removing:
+            self._remove(t)
+
+        # `op` produces the tensor before transposing, then the new transpose
+        # produces the original output
+        output = op.outputs[0]
+        untransposed_name = 'TFLITE2ONNX_Untransposed_%s' % output.name
+        untransposed = self.TFactory.getWithRef(output, untransposed_name, True)
+        untransposed.shape = tuple(output.shape[p] for p in _inversePerm(perm))
+        untransposed.setParsed()
+
+        sunk_trans = Transpose(self.TFactory, -1)
+        sunk_trans.name = 'TFLITE2ONNX_Transpose_%s' % output.name
+        sunk_trans.attrs['perm'] = perm
+        sunk_trans.inputs.append(untransposed)
+        sunk_trans.outputs.append(output)
+        output.replaceProducer(op, sunk_trans)
+        op.replaceOutput(output, untransposed)
+        untransposed.addProducer(op)
+        untransposed.addConsumer(sunk_trans)
+        sunk_trans.setParsed()
+        self.worklist.append(sunk_trans)
+        self._revisit(output)